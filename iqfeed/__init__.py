@@ -2,4 +2,7 @@
 # "from iqfeed import Service" instead of from "iqfeed.service import Service".
 # flake8: noqa
 from .connection import Connection
+from .async_connection import AsyncConnection
+from .multiplexer import StreamingMultiplexer
+from .pool import ConnectionPool
 from .service import Service
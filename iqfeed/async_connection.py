@@ -0,0 +1,289 @@
+from iqfeed.connection import (
+    BUFFER_SIZE,
+    FUNDAMENTAL_PREFIX,
+    PROTOCOL_PREFIX,
+    REQUEST_FUNDAMENTAL_MSG,
+    REQUEST_UPDATE_MSG,
+    SET_PROTOCOL_MSG,
+    UPDATE_PREFIX,
+    BaseConnection,
+)
+import asyncio
+import logging
+import pandas as pd
+import socket
+
+log = logging.getLogger(__name__)
+
+"""
+The AsyncConnection class is the asyncio counterpart of Connection. Each
+connection is a pair of asyncio streams instead of a blocking socket, so many
+L1 / L2 streams can be read concurrently on a single thread e.g.
+
+    async def main(symbols):
+        connections = [AsyncConnection(port=5009) for _ in symbols]
+        for connection, symbol in zip(connections, symbols):
+            await connection.connect()
+            await connection.symbol_watch(symbol)
+        await asyncio.gather(*(consume(c.stream()) for c in connections))
+
+Message parsing is shared with Connection through BaseConnection.
+"""
+
+
+class AsyncConnection(BaseConnection):
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        name: str = "",
+        timeout: int = 300,
+    ):
+        """
+        Args:
+            port: (int) port number of the IQFeed API.
+            host: (str) host address of the IQConnect service.
+            name: (str) optional unique name for the connection.
+            timeout: (int) seconds before connecting or reading times out.
+        """
+        super().__init__(port=port, host=host, name=name)
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.disconnect()
+
+    async def connect(self) -> None:
+        """
+        Open the asyncio streams to the given host:port combination. Then
+        initialize the connection the same way as Connection.connect().
+        """
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._port),
+                timeout=self._timeout,
+            )
+        except ConnectionRefusedError:
+            log.error("Connection refused %s:%s", self._host, self._port)
+            return None
+
+        sock = self._writer.get_extra_info("socket")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if self._port in [9100, 9300]:
+            # Nothing to read when initially connecting to 9100 or 9300.
+            self._connected = True
+            await self.write_bytes(SET_PROTOCOL_MSG)
+            await self.read()
+        elif self._port in [5009, 9200]:
+            # There are 5 response messages when connecting to L1 / L2.
+            messages = await self.read()
+            self._connected = self.check_startup(messages)
+            if self._connected:
+                await self.write_bytes(
+                    SET_PROTOCOL_MSG
+                    + REQUEST_FUNDAMENTAL_MSG
+                    + REQUEST_UPDATE_MSG
+                )
+                # Nothing else has been requested on the new connection, so
+                # any error is a rejected command.
+                responses = await self._read_responses(
+                    prefixes=(
+                        PROTOCOL_PREFIX,
+                        FUNDAMENTAL_PREFIX,
+                        UPDATE_PREFIX,
+                    ),
+                    raise_errors=True,
+                )
+                self._set_fieldnames(responses)
+
+        # Log whether the connection was successful or not.
+        if self._connected:
+            log.info("Connected %s:%s", self._host, self._port)
+        else:
+            log.warning("Connection fail %s:%s", self._host, self._port)
+
+        return None
+
+    async def disconnect(self) -> None:
+        """
+        Close the streams and change status of the connection.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+        self._connected = False
+
+        return None
+
+    async def write(self, message: str | bytes) -> None:
+        """
+        Write a message to the stream and wait until it is flushed.
+
+        Args:
+            message: (str | bytes) already encoded messages skip the encoding.
+        Returns:
+            None
+        """
+        if not isinstance(message, (bytes, bytearray)):
+            message = message.encode("utf-8")
+        await self.write_bytes(message)
+
+        return None
+
+    async def write_bytes(self, message: bytes) -> None:
+        """
+        Write an already encoded message to the stream and wait until it is
+        flushed.
+
+        Args:
+            message: (bytes)
+        Returns:
+            None
+        """
+        self._writer.write(message)
+        await self._writer.drain()
+
+        return None
+
+    async def read(self) -> list | pd.DataFrame:
+        """
+        Read messages from the stream. The returned data is the same as
+        Connection.read().
+        """
+        if len(self._pending_frames) > 0:
+            return self._process(buffer=self._take_pending())
+
+        return self._process(buffer=await self._recv())
+
+    async def read_bulk(self, terminator: bytes = b"!ENDMSG!") -> bytes:
+        """
+        Read the raw messages of a whole response. The returned data is the
+        same as Connection.read_bulk().
+        """
+        return await self._run(self._parse_bulk(terminator))
+
+    async def _run(self, parser):
+        """
+        Run one of the BaseConnection._parse_* generators, receiving from the
+        stream whenever it needs another buffer. The same as Connection._run().
+
+        Args:
+            parser: generator that is sent each buffer received.
+        Returns:
+            The value returned by the parser.
+        """
+        buffer = None
+        try:
+            next(parser)
+            while True:
+                buffer = await self._recv()
+                parser.send(buffer)
+        except StopIteration as stop:
+            if buffer == b"":
+                log.warning("Connection closed %s:%s", self._host, self._port)
+                await self.disconnect()
+            return stop.value
+
+    async def stream(self):
+        """
+        Asynchronous generator yielding the data of each read until the
+        connection is closed by the API.
+        """
+        if len(self._pending_frames) > 0:
+            yield self._process(buffer=self._take_pending())
+
+        while True:
+            buffer = await self._recv()
+            if buffer == b"":
+                break
+            yield self._process(buffer=buffer)
+
+    async def _recv(self) -> bytes:
+        """
+        Receive raw bytes from the stream up to the end of a message.
+
+        Returns:
+            (bytes) one or more complete messages separated by \n. Empty when
+            the connection has been closed.
+        """
+        chunks = [await self._read_chunk()]
+        while chunks[-1] != b"" and chunks[-1][-1:] != b"\n":
+            chunks.append(await self._read_chunk())
+        if chunks[-1] == b"":
+            self._connected = False
+
+        return b"".join(chunks)
+
+    async def _read_chunk(self) -> bytes:
+        """
+        Read whatever is available on the stream, waiting at most timeout
+        seconds. Raises TimeoutError the same as a blocking socket.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._reader.read(BUFFER_SIZE),
+                timeout=self._timeout,
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Read timed out {self._host}:{self._port}")
+
+    async def _read_until(self, predicate, raise_errors: bool = False) -> str:
+        """
+        Read from the stream until a frame matches the predicate. Refer to
+        BaseConnection._parse_until().
+        """
+        return await self._run(self._parse_until(predicate, raise_errors))
+
+    async def _read_responses(
+        self,
+        prefixes: tuple,
+        raise_errors: bool = False,
+    ) -> dict:
+        """
+        Read from the stream until a message starting with each of the
+        prefixes has been received. Refer to BaseConnection._parse_responses().
+        """
+        return await self._run(self._parse_responses(prefixes, raise_errors))
+
+    async def symbol_watch(self, symbol: str) -> None:
+        """
+        Begins watching a symbol for Level 1 or Level 2 updates.
+
+        Args:
+            symbol: (str) of the symbol to watch.
+        Returns:
+            None
+        """
+        self._symbol = symbol
+        if self._watch_fmt is None:
+            log.error("Must be L1 or L2 connection to stream symbol.")
+            return None
+
+        msg_watch = self._watch_fmt % self._symbol.encode("utf-8")
+        if self._update_fieldnames:
+            # Fieldnames already known for the connection are still valid.
+            await self.write_bytes(msg_watch)
+            return None
+
+        await self.write_bytes(msg_watch + REQUEST_UPDATE_MSG)
+        responses = await self._read_responses(prefixes=(UPDATE_PREFIX,))
+        self._set_fieldnames(responses)
+
+        return None
+
+    async def symbol_terminate(self) -> None:
+        """
+        Terminates watching a symbol for updates or trades.
+        """
+        if self._term_fmt is None:
+            log.error("Failed to terminate. No L1 or L2 stream connection.")
+            return None
+
+        await self.write_bytes(self._term_fmt % self._symbol.encode("utf-8"))
+
+        return None
@@ -3,6 +3,37 @@ from sys import platform
 # This is sent to IQFeed using "S,SET PROTOCOL,{PROTOCOL}" on each API launch.
 PROTOCOL = "6.2"
 
+# Update fieldnames for protocol 6.2 that always hold a number. These columns are
+# parsed as float64 when streaming from the L1 / L2 ports. Blank values are NaN.
+NUMERIC_FIELDS = {
+    "Ask",
+    "Ask Change",
+    "Ask Size",
+    "Bid",
+    "Bid Change",
+    "Bid Size",
+    "Change",
+    "Change From Open",
+    "Close",
+    "Extended Trade",
+    "Extended Trade Size",
+    "High",
+    "Last",
+    "Last Size",
+    "Low",
+    "Most Recent Trade",
+    "Most Recent Trade Size",
+    "Number of Trades Today",
+    "Open",
+    "Open Interest",
+    "Percent Change",
+    "Range",
+    "Settlement",
+    "Spread",
+    "Total Volume",
+    "VWAP",
+}
+
 # GCP Storage bucket names for each security type below. These buckets store the
 # historical interval data for all of the SECURITIES listed in config.py.
 BUCKETS = {
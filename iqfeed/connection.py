@@ -1,19 +1,52 @@
 from iqfeed import config
+import contextlib
+import csv
+import io
 import logging
 import pandas as pd
+import re
+import selectors
 import socket
 
 log = logging.getLogger(__name__)
 
+# Size in bytes of the userspace buffer used when reading from the socket.
+BUFFER_SIZE = 65536
+# Initial size in bytes of the preallocated buffer that Connection receives
+# into. The buffer doubles in size whenever a message doesn't fit.
+RECV_BUFFER_SIZE = 1 << 20
 
-class Connection:
-    def __init__(
-        self,
-        port: int,
-        host: str = "127.0.0.1",
-        name: str = "",
-        timeout: int = 300,
-    ):
+# Patterns used to pull update and admin stats messages out of a raw buffer. The
+# leading "Q," of an update message is not captured.
+STREAM_PATTERN = re.compile(rb"^Q,([^\r\n]*)", re.MULTILINE)
+ADMIN_PATTERN = re.compile(rb"^S,STATS,[^\r\n]*", re.MULTILINE)
+
+# Commands that never change are encoded once when the module is loaded.
+SET_PROTOCOL_MSG = f"S,SET PROTOCOL,{config.PROTOCOL}\r\n".encode("utf-8")
+REQUEST_FUNDAMENTAL_MSG = b"S,REQUEST FUNDAMENTAL FIELDNAMES\r\n"
+REQUEST_UPDATE_MSG = b"S,REQUEST CURRENT UPDATE FIELDNAMES\r\n"
+# Prefixes of the responses to setting the protocol and requesting fieldnames.
+PROTOCOL_PREFIX = b"S,CURRENT PROTOCOL,"
+FUNDAMENTAL_PREFIX = b"S,FUNDAMENTAL FIELDNAMES,"
+UPDATE_PREFIX = b"S,CURRENT UPDATE FIELDNAMES,"
+
+# Templates for watching and terminating a symbol on the L1 / L2 ports. The L2
+# port uses Market By Order (MBO) commands.
+WATCH_FORMATS = {5009: b"w%s\r\n", 9200: b"WOR,%s\r\r\n"}
+TERMINATE_FORMATS = {5009: b"r%s\r\n", 9200: b"ROR,%s\r\r\n"}
+
+
+class BaseConnection:
+    def __init__(self, port: int, host: str = "127.0.0.1", name: str = ""):
+        """
+        State and message parsing shared by the blocking Connection and the
+        asyncio based AsyncConnection. Nothing in this class touches a socket.
+
+        Args:
+            port: (int) port number of the IQFeed API.
+            host: (str) host address of the IQConnect service.
+            name: (str) optional unique name for the connection.
+        """
         self._port = port
         self._host = host
         self._name = name
@@ -21,8 +54,472 @@ class Connection:
         self._symbol = None
         self._fundamental_fieldnames = []
         self._update_fieldnames = []
+        # Frames received while waiting for the response to a command, such as
+        # stream updates, are kept here and returned by the next read().
+        self._pending_frames = []
+        # Commands for watching / terminating symbols depend only on the port.
+        self._watch_fmt = WATCH_FORMATS.get(port)
+        self._term_fmt = TERMINATE_FORMATS.get(port)
+        # How a received buffer is processed also depends only on the port, so
+        # the method is bound once rather than checking the port on every read.
+        if port == 9300:
+            self._process = self._process_admin
+        elif port in [5009, 9200]:
+            self._process = self._process_stream
+        else:
+            self._process = self._process_messages
+
+    def _split_messages(self, buffer: bytes) -> tuple[list, bool]:
+        """
+        Split a buffer of complete messages received from the API on \n, then
+        log and drop any errors.
+
+        Args:
+            buffer: (bytes) one or more messages separated by \n.
+        Returns:
+            (tuple) of the bytes messages excluding errors and a bool that is
+            True if the messages contain a system message.
+        """
+        messages = buffer.split(b"\n")
+        # When only one message exists, splitting creates an empty list element.
+        if messages[-1] == b"":
+            del messages[-1]
+
+        # Log and drop errors returned by the API. In the same pass, check if
+        # there is a system message, which starts with "S".
+        return self.check_error(messages=messages)
+
+    def _process_admin(self, buffer: bytes) -> pd.DataFrame:
+        """
+        Process a buffer from the admin port into a data frame of STATS.
+        """
+        # The messages are only split to log errors, so a buffer is only split
+        # when it holds an error rather than once for every STATS message.
+        if buffer.startswith(b"E,") or b"\nE," in buffer:
+            self._split_messages(buffer=buffer)
+
+        return self.process_admin(buffer=buffer)
+
+    def _process_stream(self, buffer: bytes) -> list | pd.DataFrame:
+        """
+        Process a buffer from the L1 / L2 ports. Update messages are returned
+        as a data frame unless the buffer holds system messages, which are
+        returned as a list of strings.
+        """
+        messages, is_system_message = self._split_messages(buffer=buffer)
+        if is_system_message:
+            return [message.decode("utf-8") for message in messages]
+
+        return self.process_stream(buffer=buffer)
+
+    def _process_messages(self, buffer: bytes) -> list:
+        """
+        Process a buffer from any other port into a list of strings.
+        """
+        messages, _ = self._split_messages(buffer=buffer)
+
+        # Messages are only decoded when they are returned as strings.
+        return [message.decode("utf-8") for message in messages]
+
+    def _find_pending(self, predicate, start: int = 0) -> str:
+        """
+        Remove and return the first pending frame from index start onwards
+        that matches the predicate.
+
+        Args:
+            predicate: callable taking a bytes frame and returning a bool.
+            start: (int) index of the first pending frame to check.
+        Returns:
+            (str) decoded frame that matched or None.
+        """
+        for i in range(start, len(self._pending_frames)):
+            if predicate(self._pending_frames[i]):
+                return self._pending_frames.pop(i).decode("utf-8")
+
+        return None
+
+    def _take_pending(self) -> bytes:
+        """
+        Remove and return all of the pending frames as a single buffer.
+        """
+        buffer = b"\n".join(self._pending_frames) + b"\n"
+        self._pending_frames = []
+
+        return buffer
+
+    def _parse_bulk(self, terminator: bytes):
+        """
+        Collect the raw messages of a whole response e.g. from the lookup port,
+        which ends with a message containing the terminator. The messages are
+        not split or decoded, so they can be parsed in one pass.
+
+        This and the other _parse_* methods are generators that yield whenever
+        another buffer is needed and are sent each buffer that is received.
+        Connection and AsyncConnection run them with their own I/O.
+
+        Args:
+            terminator: (bytes) marking the message that ends the response.
+        Returns:
+            (bytes) messages before the terminating message, which is dropped.
+            Whatever was received if the connection is closed first.
+        """
+        # Each receive ends on a complete message, so the terminating message
+        # is always within a single chunk and only the newest chunk is
+        # searched. The chunks are copied into the result once at the end
+        # instead of into a buffer that is reallocated as it grows.
+        chunks = [self._take_pending()] if self._pending_frames else []
+        chunk = chunks[-1] if chunks else b""
+        while True:
+            end = chunk.find(terminator)
+            if end >= 0:
+                # The terminating message may begin with a request_id.
+                chunks[-1] = chunk[: chunk.rfind(b"\n", 0, end) + 1]
+                return b"".join(chunks)
+
+            chunk = yield
+            if chunk == b"":
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def _parse_until(self, predicate, raise_errors: bool = False):
+        """
+        Parse received buffers into frames until one matches the predicate.
+        Any other frames, such as stream updates that arrive before the
+        response to a command, are kept for the next read() instead of being
+        lost.
+
+        Args:
+            predicate: callable taking a bytes frame and returning a bool.
+            raise_errors: (bool) raise ConnectionError on an error message
+                instead of logging it and waiting for the frame.
+        Returns:
+            (str) decoded frame that matched or None if the connection closed.
+        """
+        start = 0
+        while True:
+            frame = self._find_pending(predicate, start=start)
+            if frame is not None:
+                return frame
+
+            # Only the newly received frames need to be checked next time.
+            start = len(self._pending_frames)
+            buffer = yield
+            if buffer == b"":
+                return None
+            if raise_errors:
+                self._raise_error(buffer)
+            messages, _ = self._split_messages(buffer=buffer)
+            self._pending_frames.extend(messages)
+
+    def _parse_responses(self, prefixes: tuple, raise_errors: bool = False):
+        """
+        Parse received buffers until a message starting with each of the
+        prefixes has been received. The responses to a batch of commands can
+        arrive across several reads and interleaved with other messages.
+
+        Args:
+            prefixes: (tuple) of bytes prefixes of the expected responses.
+            raise_errors: (bool) raise ConnectionError on an error message
+                instead of waiting for responses that will never arrive.
+        Returns:
+            (dict) of each prefix and the decoded message that it matched.
+            Prefixes that weren't received before the connection closed are
+            missing.
+        """
+        responses = {}
+        for prefix in prefixes:
+            response = yield from self._parse_until(
+                lambda frame: frame.startswith(prefix),
+                raise_errors=raise_errors,
+            )
+            if response is None:
+                break
+            responses[prefix] = response
+
+        return responses
+
+    def _set_fieldnames(self, responses: dict) -> None:
+        """
+        Keep the fieldnames of any FUNDAMENTAL FIELDNAMES or CURRENT UPDATE
+        FIELDNAMES message in the responses to a batch of commands.
+
+        Args:
+            responses: (dict) of each prefix and the decoded message.
+        Returns:
+            None
+        """
+        if FUNDAMENTAL_PREFIX in responses:
+            self._fundamental_fieldnames = self._split_fieldnames(
+                responses[FUNDAMENTAL_PREFIX]
+            )
+        if UPDATE_PREFIX in responses:
+            self._update_fieldnames = self._split_fieldnames(
+                responses[UPDATE_PREFIX]
+            )
+
+        return None
+
+    def _raise_error(self, buffer: bytes) -> None:
+        """
+        Raise the first error message in a buffer of complete messages. While
+        waiting for the responses to a batch of commands e.g. when connecting,
+        an error means one of the commands was rejected and its response will
+        never arrive.
+
+        Args:
+            buffer: (bytes) one or more messages separated by \n.
+        Returns:
+            None if there are no error messages.
+        """
+        if buffer.startswith(b"E,"):
+            start = 0
+        else:
+            start = buffer.find(b"\nE,") + 1
+            if start == 0:
+                return None
+
+        end = buffer.find(b"\n", start)
+        error = buffer[start:end].rstrip(b"\r").decode("utf-8")
+        raise ConnectionError(
+            f"IQFeed Error: {error} {self._host}:{self._port}"
+        )
+
+    def check_error(self, messages: list) -> tuple[list, bool]:
+        """
+        Check the list of split messages for error codes from the API, which
+        begin with a capital 'E'. Every error is logged and excluded from the
+        returned messages. The same pass checks for a leading "S", which
+        indicates system messages e.g. startup messages from intializing a
+        connection to an L1 / L2 port.
+
+        Args:
+            messages: (list) bytes responses from socket connection split on \n.
+        Returns:
+            (tuple) of the messages excluding errors and a bool that is True if
+            the messages contain a system message.
+        """
+        kept = []
+        is_system_message = False
+        for message in messages:
+            if message.startswith(b"E,"):
+                error = message.split(b",", 2)[1].decode("utf-8")
+                log.error("IQFeed Error: %s", error)
+                continue
+            elif message.startswith(b"S,"):
+                is_system_message = True
+            kept.append(message)
+
+        return kept, is_system_message
+
+    def check_startup(self, messages: list) -> bool:
+        """
+        Check the startup messages that are returned when initiating an L1 / L2
+        stream. Once connected, IQConnect will deliver five data messages
+        separated by a new line character. If the messages are as expected and
+        the server is connected, then return True.
+
+        Args:
+            messages: (list) responses from initial connection split on \n.
+        Returns:
+            (bool) whether the server connection was successful or not.
+        """
+        # Of the five startup messages (KEYOK, CUST, IP, SERVER CONNECTED and
+        # KEY) only SERVER CONNECTED indicates whether the server is connected.
+        # "S,SERVER DISCONNECTED" doesn't contain this substring.
+        return "S,SERVER CONNECTED" in "\n".join(messages)
+
+    def process_admin(self, buffer: bytes) -> pd.DataFrame:
+        """
+        Process csv data that is returned on the admin port 9300 and return the
+        cleaned and separated data as a data frame. Refer to the documentation
+        https://www.iqfeed.net/dev/api/docs/AdminSystemMessages.cfm
+
+        Args:
+            buffer: (bytes) raw csv messages received from admin socket.
+        Returns:
+            pd.DataFrame containing the cleaned and separated data.
+        """
+        # Only STATS messages are kept. CURRENT PROTOCOL and CLIENTSTATS
+        # messages are ignored. A STATS message is sent every second, so most
+        # buffers hold nothing else and are parsed without filtering.
+        if self._all_start_with(buffer, b"S,STATS,"):
+            return self._read_csv(buffer)
+        if b"S,STATS," not in buffer:
+            return pd.DataFrame()
+
+        return self._read_csv(b"\n".join(ADMIN_PATTERN.findall(buffer)))
+
+    def process_stream(self, buffer: bytes) -> pd.DataFrame:
+        """
+        Process csv data that is returned on the level 1 port 5009 or the level
+        2 port 9200 based on the expected fields for the connection. Then return
+        cleaned and separated data as a data frame. Refer to the documentation
+        https://www.iqfeed.net/dev/api/docs/AdminSystemMessages.cfm
+
+        Args:
+            buffer: (bytes) raw csv messages received from L1 / L2.
+        Returns:
+            pd.DataFrame containing the cleaned and separated data.
+        """
+        # Numeric fields are converted by the C parser straight into float64
+        # columns. All other fields are kept as strings.
+        fieldnames = self._update_fieldnames or []
+        numeric = [name for name in fieldnames if name in config.NUMERIC_FIELDS]
+        dtype = {name: str for name in fieldnames}
+        dtype.update({name: "float64" for name in numeric})
+
+        if len(fieldnames) > 0 and self._all_start_with(buffer, b"Q,"):
+            # The leading "Q" and the empty field after the trailing comma of
+            # every message are read into columns that are dropped, so the
+            # buffer is parsed as is without copying any rows.
+            data = buffer
+            names = ["message_type", *fieldnames, "end_of_message"]
+        else:
+            rows = STREAM_PATTERN.findall(buffer)
+            if len(rows) == 0:
+                return pd.DataFrame(columns=self._update_fieldnames)
+            data = b"\n".join(rows)
+            names = self._update_fieldnames
+
+        # Update messages end in a trailing comma, which creates an extra blank
+        # column that is dropped by only using the expected fieldnames. Fields
+        # that are quoted may contain commas.
+        return self._read_csv(
+            data,
+            dtype=dtype or str,
+            names=names,
+            usecols=self._update_fieldnames,
+            na_values={name: [""] for name in numeric},
+            quoting=csv.QUOTE_MINIMAL,
+        )
+
+    def _all_start_with(self, buffer: bytes, prefix: bytes) -> bool:
+        """
+        Check whether every message in a buffer of complete messages starts
+        with the prefix e.g. only update messages on a busy L1 / L2 stream.
+        Both counts are single scans of the buffer in C.
+
+        Args:
+            buffer: (bytes) raw csv messages ending in \n.
+            prefix: (bytes) expected start of every message.
+        Returns:
+            (bool) True if every message starts with the prefix.
+        """
+        return buffer.startswith(prefix) and buffer.count(b"\n") == (
+            buffer.count(b"\n" + prefix) + 1
+        )
+
+    def _read_csv(
+        self,
+        data: bytes,
+        dtype: type | dict = str,
+        quoting: int = csv.QUOTE_NONE,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Parse csv messages with the pandas C parser. By default every field is
+        kept as a string and fields are split on every comma the same as
+        str.split(",").
+
+        Args:
+            data: (bytes) csv messages separated by new line characters.
+            dtype: (type | dict) of the column types passed to pd.read_csv.
+            quoting: (int) csv quoting constant. Use csv.QUOTE_MINIMAL to keep
+                commas that are inside quoted fields.
+            kwargs: additional keyword arguments passed to pd.read_csv.
+        Returns:
+            pd.DataFrame containing the parsed data.
+        """
+        return pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            dtype=dtype,
+            keep_default_na=False,
+            quoting=quoting,
+            engine="c",
+            **kwargs,
+        )
+
+    def _split_fieldnames(self, message: str) -> list:
+        """
+        Split a FUNDAMENTAL FIELDNAMES or CURRENT UPDATE FIELDNAMES message
+        into the list of fieldnames.
+
+        Args:
+            message: (str) fieldnames message or None if it wasn't received.
+        Returns:
+            (list) of the fieldnames or None.
+        """
+        if message is None:
+            return None
+
+        return message.split(",")[2:]
+
+
+class Connection(BaseConnection):
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        name: str = "",
+        timeout: int = 300,
+        socket_options: list = None,
+    ):
+        """
+        Args:
+            port: (int) port number of the IQFeed API.
+            host: (str) host address of the IQConnect service.
+            name: (str) optional unique name for the connection.
+            timeout: (int) seconds before connecting or reading times out.
+            socket_options: (list) optional (level, optname, value) tuples that
+                are applied with setsockopt in addition to TCP_NODELAY.
+        """
+        super().__init__(port=port, host=host, name=name)
+        # Set by ConnectionPool.acquire so that leaving a with block returns the
+        # connection to the pool instead of disconnecting.
+        self._pool = None
+        # Writes made inside a batch() block are queued here until flush().
+        self._batching = False
+        self._pending_writes = []
+        self._timeout = timeout
         self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # The socket timeout only applies while connecting. A socket timeout
+        # makes every recv wait on poll first, so reads instead wait on the
+        # selector and only when no data is already waiting.
         self.connection.settimeout(timeout)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.connection, selectors.EVENT_READ)
+        # Disable Nagle's algorithm. Commands sent to IQFeed are tiny and each
+        # write is followed by a read, so there is nothing to gain by having
+        # the kernel wait to coalesce packets.
+        options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+        if socket_options is not None:
+            options += socket_options
+        for level, optname, value in options:
+            self.connection.setsockopt(level, optname, value)
+        # Preallocated buffer that the socket receives into directly, so many
+        # small messages are collected by a single recv without creating an
+        # intermediate bytes object per chunk.
+        self._buffer = bytearray(RECV_BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        # Length of an incomplete message at the start of the buffer that was
+        # left over from the previous receive.
+        self._tail = 0
+        # sendall keeps sending until the whole message is written, whereas
+        # send may return early and silently truncate a command.
+        self._send = self.connection.sendall
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # A with block that raised may have left part of a response unread,
+        # which the next user of a pooled connection would read as its own.
+        if self._pool is not None and exc_type is None:
+            self._pool.release(self)
+        else:
+            self._pool = None
+            self.disconnect()
 
     def connect(self) -> None:
         """
@@ -34,6 +531,7 @@ class Connection:
         # connection. However, the lookup port returns nothing.
         try:
             self.connection.connect((self._host, self._port))
+            self.connection.settimeout(None)
             if self._port in [9100, 9300]:
                 # Nothing to read when initially connecting to 9100 or 9300.
                 self._connected = True
@@ -43,20 +541,34 @@ class Connection:
                 messages = self.read()
                 if messages is not None:
                     self._connected = self.check_startup(messages)
-                    self.set_protocol()
                 if self._connected:
-                    self._fundamental_fieldnames = self.request_fieldnames("F")
-                    self._update_fieldnames = self.request_fieldnames("Q")
+                    # Set the protocol and request both sets of fieldnames with
+                    # a single send, then collect the three responses.
+                    with self.batch():
+                        self.write_bytes(SET_PROTOCOL_MSG)
+                        self.write_bytes(REQUEST_FUNDAMENTAL_MSG)
+                        self.write_bytes(REQUEST_UPDATE_MSG)
+                    # Nothing else has been requested on the new connection,
+                    # so any error is a rejected command.
+                    responses = self._read_responses(
+                        prefixes=(
+                            PROTOCOL_PREFIX,
+                            FUNDAMENTAL_PREFIX,
+                            UPDATE_PREFIX,
+                        ),
+                        raise_errors=True,
+                    )
+                    self._set_fieldnames(responses)
             else:
                 self._connected = False
         except ConnectionRefusedError:
-            log.error(f"Connection refused {self._host}:{self._port}")
+            log.error("Connection refused %s:%s", self._host, self._port)
 
         # Log whether the connection was successful or not.
         if self._connected:
-            log.info(f"Connected {self._host}:{self._port}")
+            log.info("Connected %s:%s", self._host, self._port)
         else:
-            log.warning(f"Connection fail {self._host}:{self._port}")
+            log.warning("Connection fail %s:%s", self._host, self._port)
 
         return None
 
@@ -65,25 +577,73 @@ class Connection:
         Disconnect from the API and change status of the connection.
         """
         # self.connection.shutdown(socket.SHUT_RDWR) # Err: Bad file descriptor.
+        self._selector.close()
         self.connection.close()
         self._connected = False
 
         return None
 
-    def write(self, message: str) -> None:
+    def write(self, message: str | bytes) -> None:
         """
         Write a message to the socket TCP connection.
 
         Args:
-            message: (str)
+            message: (str | bytes) already encoded messages skip the encoding.
         Returns:
             None
         """
-        self.connection.send(message.encode("utf-8"))
+        if not isinstance(message, (bytes, bytearray)):
+            message = message.encode("utf-8")
+        self.write_bytes(message)
+
+        return None
+
+    def write_bytes(self, message: bytes) -> None:
+        """
+        Write an already encoded message to the socket TCP connection.
+
+        Args:
+            message: (bytes)
+        Returns:
+            None
+        """
+        if self._batching:
+            self._pending_writes.append(message)
+        else:
+            self._send(message)
+
+        return None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Queue every write made inside the with block and send them together
+        when the block exits. IQConnect accepts several commands separated by
+        \r\n in a single TCP segment, so this saves a syscall per command.
+
+        Usage:
+            with connection.batch():
+                connection.write("S,REQUEST FUNDAMENTAL FIELDNAMES\r\n")
+                connection.write("S,REQUEST CURRENT UPDATE FIELDNAMES\r\n")
+        """
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = False
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Send all queued writes to the socket with a single sendall.
+        """
+        if len(self._pending_writes) > 0:
+            self._send(b"".join(self._pending_writes))
+            self._pending_writes.clear()
 
         return None
 
-    def read(self) -> str | pd.DataFrame:
+    def read(self) -> list | pd.DataFrame:
         """
         Read messages from the stream connection. Separate message types have
         different initial encodings, which indicate the message type.
@@ -97,38 +657,184 @@ class Connection:
         S is a system message. e.g. connected / disconnected.
         T is a timestamp message.
         """
-        # Data received as a string. Continue receiving chunks until the new
-        # line character is received, which denotes the end of a message.
-        msg = self.connection.recv(1024).decode("utf-8")
-        while msg is not None and msg != "" and msg[-1] != "\n":
-            msg += self.connection.recv(1024).decode("utf-8")
+        if len(self._pending_frames) > 0:
+            return self._process(buffer=self._take_pending())
 
-        messages = msg.split("\n")
-        # When only one message exists, splitting creates an empty list element.
-        if msg is not None and messages[-1] == "":
-            del messages[-1]
+        return self._process(buffer=self._recv())
 
-        # Check if there are errors returned by the API and add to logging.
-        messages = self.check_error(messages=messages)
-        # Check if message is a system message, which starts with "S".
-        is_system_message = self.check_system_messages(messages=messages)
+    def read_bulk(self, terminator: bytes = b"!ENDMSG!") -> bytes:
+        """
+        Read the raw messages of a whole response e.g. from the lookup port.
+        Refer to BaseConnection._parse_bulk().
 
-        if self._port == 9300:
-            data = self.process_admin(messages=messages)
-        elif self._port in [5009, 9200] and not is_system_message:
-            data = self.process_stream(messages=messages)
-        else:
-            data = messages
+        Args:
+            terminator: (bytes) marking the message that ends the response.
+        Returns:
+            (bytes) messages before the terminating message, which is dropped.
+            Whatever was received if the connection is closed first.
+        """
+        return self._run(self._parse_bulk(terminator))
+
+    def _run(self, parser):
+        """
+        Run one of the BaseConnection._parse_* generators, receiving from the
+        socket whenever it needs another buffer.
+
+        Args:
+            parser: generator that is sent each buffer received.
+        Returns:
+            The value returned by the parser.
+        """
+        buffer = None
+        try:
+            next(parser)
+            while True:
+                buffer = self._recv()
+                parser.send(buffer)
+        except StopIteration as stop:
+            if buffer == b"":
+                log.warning("Connection closed %s:%s", self._host, self._port)
+                # Mark the connection as disconnected so that it is replaced
+                # instead of being reused by Service.connection().
+                self.disconnect()
+            return stop.value
+
+    def _recv(self) -> bytes:
+        """
+        Receive raw bytes from the socket up to the end of a message.
+
+        Returns:
+            (bytes) one or more complete messages separated by \n. Empty when
+            the connection has been closed.
+        """
+        # Data received as bytes. Continue receiving into the buffer until a
+        # new line character is received, which denotes the end of a message.
+        # Only the offset is tracked so nothing is copied until the complete
+        # messages are returned.
+        offset = self._tail
+        while True:
+            if offset == len(self._buffer):
+                self._grow_buffer()
+            n_bytes = self._recv_into(self._view[offset:])
+            if n_bytes == 0:
+                # Connection closed. Return anything left over as is.
+                self._tail = 0
+                self._connected = False
+                return bytes(self._view[:offset])
+
+            # Only the newly received bytes need to be searched.
+            end = self._buffer.rfind(b"\n", offset, offset + n_bytes)
+            offset += n_bytes
+            if end >= 0:
+                break
+
+        return self._take_messages(end=end, offset=offset)
+
+    def _recv_nowait(self) -> bytes:
+        """
+        Receive once without waiting, e.g. for a socket that select reported
+        as ready. Unlike _recv, this never waits for the rest of a message.
+
+        Returns:
+            (bytes) complete messages separated by \n. Empty if only part of
+            a message has arrived so far, which is kept for the next receive.
+            When the connection has been closed, anything left over is
+            returned as is and the connection is marked as disconnected.
+        """
+        offset = self._tail
+        if offset == len(self._buffer):
+            self._grow_buffer()
+        try:
+            n_bytes = self.connection.recv_into(
+                self._view[offset:], 0, socket.MSG_DONTWAIT
+            )
+        except BlockingIOError:
+            return b""
+        if n_bytes == 0:
+            self._tail = 0
+            self._connected = False
+            return bytes(self._view[:offset])
+
+        end = self._buffer.rfind(b"\n", offset, offset + n_bytes)
+        offset += n_bytes
+        if end < 0:
+            self._tail = offset
+            return b""
+
+        return self._take_messages(end=end, offset=offset)
+
+    def _take_messages(self, end: int, offset: int) -> bytes:
+        """
+        Return the complete messages in the receive buffer up to the last \n
+        at index end. An incomplete last message is kept at the start of the
+        buffer for the next receive.
+
+        Args:
+            end: (int) index of the last \n received.
+            offset: (int) number of bytes in the buffer.
+        Returns:
+            (bytes) complete messages separated by \n.
+        """
+        messages = bytes(self._view[: end + 1])
+        self._tail = offset - end - 1
+        self._buffer[: self._tail] = self._buffer[end + 1 : offset]
+
+        return messages
+
+    def _recv_into(self, view: memoryview) -> int:
+        """
+        Receive into the view without waiting if data is already available,
+        which is usually the case on a busy stream. Otherwise wait on the
+        selector for at most timeout seconds before receiving.
+
+        Args:
+            view: (memoryview) of the free space in the receive buffer.
+        Returns:
+            (int) number of bytes received. Zero when the connection is closed.
+        """
+        try:
+            return self.connection.recv_into(view, 0, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            if len(self._selector.select(self._timeout)) == 0:
+                raise TimeoutError(f"Read timed out {self._host}:{self._port}")
 
-        return data
+        return self.connection.recv_into(view)
+
+    def _grow_buffer(self) -> None:
+        """
+        Double the size of the receive buffer when a message doesn't fit.
+        """
+        # A bytearray can't be resized while a memoryview of it exists.
+        self._view.release()
+        self._buffer.extend(bytes(len(self._buffer)))
+        self._view = memoryview(self._buffer)
+
+        return None
+
+    def _read_until(self, predicate, raise_errors: bool = False) -> str:
+        """
+        Read from the socket until a frame matches the predicate. Refer to
+        BaseConnection._parse_until().
+        """
+        return self._run(self._parse_until(predicate, raise_errors))
+
+    def _read_responses(
+        self,
+        prefixes: tuple,
+        raise_errors: bool = False,
+    ) -> dict:
+        """
+        Read from the socket until a message starting with each of the prefixes
+        has been received. Refer to BaseConnection._parse_responses().
+        """
+        return self._run(self._parse_responses(prefixes, raise_errors))
 
     def set_protocol(self) -> None:
         """
         The protocol must be set for every connection even if there are multiple
         connections to the same port.
         """
-        msg_protocol = f"S,SET PROTOCOL,{config.PROTOCOL}\r\n"
-        self.write(message=msg_protocol)
+        self.write_bytes(SET_PROTOCOL_MSG)
         self.read()
 
         return None
@@ -143,18 +849,24 @@ class Connection:
             None
         """
         self._symbol = symbol
-        if self._port == 5009:
-            # L1 port begin watching for symbol updates.
-            msg = f"w{self._symbol}\r\n"
-        elif self._port == 9200:
-            # L2 port begin watching symbol for Market By Order (MBO) updates.
-            msg = f"WOR,{self._symbol}\r\r\n"
-        else:
+        if self._watch_fmt is None:
             log.error("Must be L1 or L2 connection to stream symbol.")
-
-        self.write(msg)
-        # Update the expected field names coming from the API.
-        self.request_fieldnames(field_type="Q")
+            return None
+
+        msg_watch = self._watch_fmt % self._symbol.encode("utf-8")
+        if self._update_fieldnames:
+            # The update fields only change through select_fieldnames, so the
+            # fieldnames already known for the connection are still valid.
+            self.write_bytes(msg_watch)
+            return None
+
+        # Watch the symbol and request the expected field names coming from
+        # the API with a single send.
+        with self.batch():
+            self.write_bytes(msg_watch)
+            self.write_bytes(REQUEST_UPDATE_MSG)
+        responses = self._read_responses(prefixes=(UPDATE_PREFIX,))
+        self._set_fieldnames(responses)
 
         return None
 
@@ -176,10 +888,11 @@ class Connection:
             None
         """
         self._symbol = symbol
-        msg = f"BW,{self._symbol},{interval},,7"
+        msg = f"BW,{self._symbol},{interval},,7\r\n"
         self.write(msg)
-        # Update the expected field names coming from the API.
-        self.request_fieldnames(field_type="Q")
+        # Request the expected field names coming from the API if not known.
+        if not self._update_fieldnames:
+            self._update_fieldnames = self.request_fieldnames(field_type="Q")
 
         return None
 
@@ -193,10 +906,10 @@ class Connection:
             None
         """
         self._symbol = symbol
-        msg = f"t{self._symbol}\r\n"
-        log.info(f"Start watching symbol {self._symbol} on L1 port.")
-        self.write(msg)
-        self.request_fieldnames(field_type="Q")
+        log.info("Start watching symbol %s on L1 port.", self._symbol)
+        self.write_bytes(b"t%s\r\n" % self._symbol.encode("utf-8"))
+        if not self._update_fieldnames:
+            self._update_fieldnames = self.request_fieldnames(field_type="Q")
 
         return None
 
@@ -204,16 +917,11 @@ class Connection:
         """
         Terminates watching a symbol for updates or trades.
         """
-        if self._port == 5009:
-            # L1 port terminate updates.
-            msg = f"r{self._symbol}\r\n"
-        elif self._port == 9200:
-            # L2 port terminate updates.
-            msg = f"ROR,{self._symbol}\r\r\n"
-        else:
+        if self._term_fmt is None:
             log.error("Failed to terminate. No L1 or L2 stream connection.")
+            return None
 
-        self.write(msg)
+        self.write_bytes(self._term_fmt % self._symbol.encode("utf-8"))
 
         return None
 
@@ -221,126 +929,10 @@ class Connection:
         """
         Force refreshes a symbol L1 updates or trades stream.
         """
-        msg = f"f{self._symbol}\r\n"
-        self.write(msg)
+        self.write_bytes(b"f%s\r\n" % self._symbol.encode("utf-8"))
 
         return None
 
-    def check_system_messages(self, messages: list) -> bool:
-        """
-        Check the messages for the leading "S", which indicates the messages are
-        system messages. This is used to indicate whether the messages are
-        startup messages from intializing a connection to an L1 / L2 port.
-
-        Args:
-            messages: (list) responses from socket connection split on \n.
-        Returns:
-            (bool) True if the messages contain a leading "S" indicating that
-            the messages are system messages.
-        """
-        is_system_message = False
-        for message in messages:
-            split_message = message.split(",")
-            if split_message[0] == "S":
-                is_system_message = True
-                break
-
-        return is_system_message
-
-    def check_error(self, messages: list) -> list:
-        """
-        Check the list of split messages for error codes from the API, which
-        typically begin with a capital 'E'. If there is an error, log the error
-        and return the messages list excluding the error message.
-        """
-        idx_delete = None
-        for i in range(len(messages)):
-            split_message = messages[i].split(",")
-            if split_message[0] == "E":
-                idx_delete = i
-                log.error(f"IQFeed Error: {split_message[1]}")
-
-        if idx_delete is not None:
-            del messages[idx_delete]
-
-        return messages
-
-    def check_startup(self, messages: list) -> bool:
-        """
-        Check the startup messages that are returned when initiating an L1 / L2
-        stream. Once connected, IQConnect will deliver five data messages
-        separated by a new line character. If the messages are as expected and
-        the server is connected, then return True.
-
-        Args:
-            messages: (list) responses from initial connection split on \n.
-        Returns:
-            (bool) whether the server connection was successful or not.
-        """
-        is_connected = False
-        expected_messages = [
-            "KEYOK",
-            "CUST",
-            "IP",
-            "SERVER CONNECTED",
-            "KEY",
-        ]
-        # Messages are already split on new line character into a list.
-        for message in messages:
-            split_message = message.split(",")
-            if (
-                split_message[1] in expected_messages
-                and split_message[1] == "SERVER CONNECTED"
-            ):
-                is_connected = True
-
-        return is_connected
-
-    def process_admin(self, messages: list) -> pd.DataFrame:
-        """
-        Process csv data that is returned on the admin port 9300 and return the
-        cleaned and separated data as a data frame. Refer to the documentation
-        https://www.iqfeed.net/dev/api/docs/AdminSystemMessages.cfm
-
-        Args:
-            messages: (list) contains csv messages received from admin socket.
-        Returns:
-            pd.DataFrame containing the cleaned and separated data.
-        """
-        # Process CURRENT PROTOCOL, STATS, and CLIENTSTATS differently.
-        data_out = list()
-        ignore_message_types = ["CURRENT PROTOCOL", "CLIENTSTATS"]
-        split_messages = [m.split(",") for m in messages]
-        for split_message in split_messages:
-            # Ignore protocol messages and client stats.
-            if split_message[1] in ignore_message_types:
-                continue
-            elif split_message[1] == "STATS":
-                data_out.append(split_message)
-
-        return pd.DataFrame(data_out)
-
-    def process_stream(self, messages: list) -> pd.DataFrame:
-        """
-        Process csv data that is returned on the level 1 port 5009 or the level
-        2 port 9200 based on the expected fields for the connection. Then return
-        cleaned and separated data as a data frame. Refer to the documentation
-        https://www.iqfeed.net/dev/api/docs/AdminSystemMessages.cfm
-
-        Args:
-            messages: (list) contains csv messages received from L1 / L2.
-        Returns:
-            pd.DataFrame containing the cleaned and separated data.
-        """
-        data_out = []
-        for message in messages:
-            split_message = message.split(",")
-            if split_message[0] == "Q":
-                del split_message[-1]  # Drop the trailing blank space.
-                data_out.append(split_message[1:])
-
-        return pd.DataFrame(data_out, columns=self._update_fieldnames)
-
     def request_fieldnames(self, field_type: str) -> list:
         """
         There are 21 expected fields for version 6.2. It's good practice to
@@ -351,28 +943,21 @@ class Connection:
         Returns:
             (list) of the fieldnames
         """
-        return_fields = ["FUNDAMENTAL FIELDNAMES", "CURRENT UPDATE FIELDNAMES"]
-
         if field_type == "F":
-            msg = "S,REQUEST FUNDAMENTAL FIELDNAMES\r\n"
+            msg = REQUEST_FUNDAMENTAL_MSG
+            prefix = FUNDAMENTAL_PREFIX
         elif field_type == "Q":
-            msg = "S,REQUEST CURRENT UPDATE FIELDNAMES\r\n"
+            msg = REQUEST_UPDATE_MSG
+            prefix = UPDATE_PREFIX
         else:
             log.error("Need to specify field_type 'F' or 'Q'.")
+            return None
 
-        self.write(message=msg)
-        messages = self.read()
-        field_names = None
-        for message in messages:
-            split_message = message.split(",")
-            if len(split_message) < 3:
-                continue
-            elif split_message[1] not in return_fields:
-                continue
-            else:
-                field_names = split_message[2:]
+        self.write_bytes(msg)
+        # Stream updates that arrive before the response are kept for read().
+        message = self._read_until(lambda frame: frame.startswith(prefix))
 
-        return field_names
+        return self._split_fieldnames(message)
 
     def select_fieldnames(self, fieldnames: list) -> None:
         """
@@ -386,13 +971,12 @@ class Connection:
         """
         msg_fields = "S,SELECT UPDATE FIELDS," + ",".join(fieldnames) + "\r\n"
         self.write(message=msg_fields)
-        messages = self.read()
-        for message in messages:
+        message = self._read_until(
+            lambda frame: frame.startswith(UPDATE_PREFIX)
+        )
+        if message is not None:
             split_message = message.split(",")
-            if split_message[1] != "CURRENT UPDATE FIELDNAMES":
-                continue
-            else:
-                self._update_fieldnames = split_message[2:]
-                self._symbol = split_message[2]
+            self._update_fieldnames = split_message[2:]
+            self._symbol = split_message[2]
 
         return None
@@ -0,0 +1,146 @@
+from iqfeed import Connection
+import logging
+import selectors
+import time
+
+log = logging.getLogger(__name__)
+
+"""
+The StreamingMultiplexer class reads many L1 / L2 Connection objects from a
+single thread. A single select call (epoll on Linux) returns every connection
+with data waiting, so the cost of waiting is paid once per batch of ready
+sockets rather than once per connection.
+
+Usage:
+    multiplexer = StreamingMultiplexer(connections)
+    for connection, data in multiplexer.stream():
+        ...
+"""
+
+
+class StreamingMultiplexer:
+    def __init__(self, connections: list = None):
+        """
+        Args:
+            connections: (list) optional connected Connection objects to read.
+        """
+        self._selector = selectors.DefaultSelector()
+        for connection in connections or []:
+            self.register(connection)
+
+    def register(self, connection: Connection) -> None:
+        """
+        Start reading a connected Connection object.
+
+        Args:
+            connection: (Connection) that is already connected.
+        Returns:
+            None
+        """
+        self._selector.register(
+            connection.connection,
+            selectors.EVENT_READ,
+            data=connection,
+        )
+
+        return None
+
+    def unregister(self, connection: Connection) -> None:
+        """
+        Stop reading a Connection object. The connection is not disconnected.
+
+        Args:
+            connection: (Connection) previously registered.
+        Returns:
+            None
+        """
+        self._selector.unregister(connection.connection)
+
+        return None
+
+    def poll(self, timeout: float = None) -> list:
+        """
+        Wait until at least one connection has complete messages, then read
+        every connection that is ready. Each ready socket is received from
+        once without waiting, so a connection that has only sent part of a
+        message doesn't hold up the others. Connections closed by the API or
+        that fail are unregistered.
+
+        Args:
+            timeout: (float) optional seconds to wait. None waits indefinitely.
+        Returns:
+            (list) of (Connection, list | pd.DataFrame) tuples, one for each
+            connection that was read. The data is the same as Connection.read().
+        """
+        results = []
+        # Frames kept back while a connection waited for a command response
+        # are returned without waiting on the socket.
+        for key in list(self._selector.get_map().values()):
+            if len(key.data._pending_frames) > 0:
+                results.append((key.data, key.data.read()))
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._selector.get_map()) > 0:
+            if len(results) > 0:
+                wait = 0
+            elif deadline is None:
+                wait = None
+            else:
+                wait = max(deadline - time.monotonic(), 0)
+            ready = self._selector.select(wait)
+            for key, _ in ready:
+                self._read_ready(key.data, results)
+
+            # Keep waiting when only part of a message has arrived.
+            if len(results) > 0 or len(ready) == 0 or wait == 0:
+                break
+
+        return results
+
+    def _read_ready(self, connection: Connection, results: list) -> None:
+        """
+        Receive from a connection that is ready and append its data to the
+        results if any complete messages were received.
+
+        Args:
+            connection: (Connection) that select reported as ready.
+            results: (list) of (Connection, data) tuples to append to.
+        Returns:
+            None
+        """
+        try:
+            buffer = connection._recv_nowait()
+        except OSError as e:
+            log.warning("Connection '%s' failed: %s", connection._name, e)
+            connection._connected = False
+            buffer = b""
+
+        if len(buffer) > 0:
+            results.append((connection, connection._process(buffer=buffer)))
+        if not connection._connected:
+            log.warning("Connection '%s' closed by API.", connection._name)
+            self.unregister(connection)
+
+        return None
+
+    def stream(self, timeout: float = None):
+        """
+        Generator yielding (Connection, data) tuples as data arrives, until no
+        connections remain registered or nothing arrives within timeout.
+
+        Args:
+            timeout: (float) optional seconds to wait for each batch.
+        """
+        while len(self._selector.get_map()) > 0:
+            results = self.poll(timeout=timeout)
+            if len(results) == 0 and timeout is not None:
+                break
+            yield from results
+
+    def close(self) -> None:
+        """
+        Unregister every connection and close the selector.
+        """
+        self._selector.close()
+
+        return None
@@ -0,0 +1,102 @@
+from collections import defaultdict, deque
+from iqfeed import Connection
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+"""
+The ConnectionPool class keeps connected Connection objects alive between uses.
+Creating a connection costs several round trips to IQConnect: the TCP handshake,
+setting the protocol, reading the startup messages, and requesting fieldnames.
+Connections released to the pool are handed out again by acquire() so that this
+setup only happens on first use.
+
+Usage:
+    pool = ConnectionPool()
+    with pool.acquire(port=9100) as lookup:
+        lookup.write("SST\\r\\n")
+"""
+
+
+class ConnectionPool:
+    def __init__(self, timeout: int = 300):
+        """
+        Args:
+            timeout: (int) seconds a released connection may sit idle in the
+                pool before it is disconnected.
+        """
+        self._timeout = timeout
+        # Idle connections keyed by (host, port). Each entry is a tuple of the
+        # connection and the time.monotonic() timestamp it was released.
+        self._idle = defaultdict(deque)
+
+    def acquire(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        name: str = "",
+    ) -> Connection:
+        """
+        Return a connected Connection for the host:port combination. An idle
+        connection is reused when one is available, otherwise a new connection
+        is created and connected.
+
+        Args:
+            port: (int) port number.
+            host: (str) host address of the IQConnect service.
+            name: (str) optional name for a newly created connection.
+        Returns:
+            Connection that is returned to the pool when used in a with block.
+        """
+        idle = self._idle[(host, port)]
+        now = time.monotonic()
+        # Close connections from the oldest end that have been idle too long.
+        while idle and now - idle[0][1] > self._timeout:
+            expired, _ = idle.popleft()
+            expired.disconnect()
+
+        # The most recently released connection is the most likely to be warm.
+        while idle:
+            connection, _ = idle.pop()
+            if connection._connected:
+                connection._pool = self
+                return connection
+
+        connection = Connection(port=port, host=host, name=name)
+        connection.connect()
+        connection._pool = self
+
+        return connection
+
+    def release(self, connection: Connection) -> None:
+        """
+        Return a connection to the pool. Connections that are no longer
+        connected are dropped.
+
+        Args:
+            connection: (Connection) previously returned by acquire().
+        Returns:
+            None
+        """
+        connection._pool = None
+        if connection._connected:
+            key = (connection._host, connection._port)
+            self._idle[key].append((connection, time.monotonic()))
+        else:
+            log.warning(
+                "Dropped disconnected connection '%s'.", connection._name
+            )
+
+        return None
+
+    def close(self) -> None:
+        """
+        Disconnect every idle connection held by the pool.
+        """
+        for idle in self._idle.values():
+            while idle:
+                connection, _ = idle.popleft()
+                connection.disconnect()
+
+        return None
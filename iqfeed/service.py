@@ -1,13 +1,109 @@
-from datetime import datetime
-from iqfeed import Connection
+from concurrent.futures import ThreadPoolExecutor
+from iqfeed import AsyncConnection, Connection
+import asyncio
+import csv
+import io
 import logging
 import os
 import pandas as pd
+import socket
 import subprocess
 import time
 
 log = logging.getLogger(__name__)
 
+# Columns of each lookup and historical response excluding the request_id. This
+# is what is received from the API for each row of a response:
+# [RequestID (if specified)],[LS | LH],[Columns ...],\r\n
+SECURITY_TYPES_COLUMNS = ("sec_type_id", "short_name", "long_name")
+MARKET_TYPES_COLUMNS = (
+    "listed_market_id",
+    "short_name",
+    "long_name",
+    "group_id",
+    "short_group_name",
+)
+SYMBOLS_COLUMNS = ("symbol", "listed_market_id", "sec_type_id", "description")
+HISTORICAL_COLUMNS = {
+    "trades": (
+        "time_stamp",
+        "last",
+        "last_size",
+        "total_volume",
+        "bid",
+        "ask",
+        "tick_id",
+        "basis_for_last",
+        "trade_market_center",
+        "trade_conditions",
+        "trade_aggressor",
+        "day_code",
+    ),
+    "interval": (
+        "time_stamp",
+        "high",
+        "low",
+        "open",
+        "close",
+        "total_volume",
+        "period_volume",
+        "number_of_trades",
+    ),
+}
+
+# Types of the numeric columns returned by historical queries. All other columns
+# are kept as strings. Integer columns are nullable, so a blank field is a
+# missing value instead of an error for the whole query.
+HISTORICAL_DTYPES = {
+    "trades": {
+        "last": "float64",
+        "last_size": "Int32",
+        "total_volume": "Int64",
+        "bid": "float64",
+        "ask": "float64",
+        "tick_id": "Int64",
+        "trade_market_center": "Int16",
+        "day_code": "Int8",
+    },
+    "interval": {
+        "high": "float64",
+        "low": "float64",
+        "open": "float64",
+        "close": "float64",
+        "total_volume": "Int64",
+        "period_volume": "Int64",
+        "number_of_trades": "Int64",
+    },
+}
+
+# Format of the time_start and time_end of historical queries CCYYMMDD HHmmSS.
+TIME_FORMAT = "%Y%m%d %H%M%S"
+
+# Formats of the time_stamp column returned by historical queries.
+HISTORICAL_TIME_FORMATS = {
+    "trades": "%Y-%m-%d %H:%M:%S.%f",
+    "interval": "%Y-%m-%d %H:%M:%S",
+}
+
+# Columns of lookup responses that repeat the same few values across rows are
+# stored as categories.
+MARKET_TYPES_DTYPES = {"group_id": "category", "short_group_name": "category"}
+SYMBOLS_DTYPES = {"listed_market_id": "category", "sec_type_id": "category"}
+
+# Large historical responses are sent as fast as IQFeed can read them from DTN.
+# A 4MB kernel receive buffer on the lookup port keeps the sender from being
+# throttled while a previous chunk is being parsed.
+LOOKUP_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)]
+
+# Security types and market types rarely change, so their lookups are cached for
+# this many seconds.
+LOOKUP_CACHE_TTL = 3600
+
+# Maximum number of requests the API allows in a 1 second period. The API
+# replenishes one request credit every 1 / REQUEST_LIMIT seconds (20ms).
+REQUEST_LIMIT = 50
+CREDIT_INTERVAL = 1 / REQUEST_LIMIT
+
 """
 The Service class is used to launch the IQFeed API service and manage
 connections to the API. The Connection class is used for maintaining connections
@@ -33,6 +129,21 @@ are pacing violations where the API will only allow 50 requests in 1 second.
 
 
 class Service:
+    # Fixed attributes avoid a per instance __dict__.
+    __slots__ = (
+        "_host",
+        "_product",
+        "_version",
+        "_login",
+        "_password",
+        "_connected",
+        "_credits",
+        "_last_refill",
+        "_lookup_cache",
+        "connections",
+        "iqconnect_process",
+    )
+
     def __init__(
         self,
         product: str = "INSERT_PRODUCT_NAME",
@@ -55,8 +166,12 @@ class Service:
         self._login = login
         self._password = password
         self._connected = False
-        # Queue for tracking timestamps of .write() requests made to API.
-        self._time_stamp_queue = list()
+        # Request credits available for .write() requests made to the API and
+        # the time they were last replenished.
+        self._credits = float(REQUEST_LIMIT)
+        self._last_refill = time.monotonic()
+        # Cached lookup data frames keyed on the request with their expiry.
+        self._lookup_cache = {}
         # Create admin port connection and ghost level 1 port connection.
         self.connections = {
             "9300": Connection(port=9300, name="admin"),
@@ -84,7 +199,7 @@ class Service:
         )
         # The /S command is a powershell command to assist with the exe.
         iqfeed_call = wine_prefix + " " + iq_path + " " + iqfeed_args
-        log.info("Running {}".format(iqfeed_call))
+        log.info("Running %s", iqfeed_call)
 
         if not self._connected:
             self.iqconnect_process = subprocess.Popen(
@@ -98,14 +213,23 @@ class Service:
         else:
             log.warning("Not Launching. IQFeed Service is already launched.")
 
-        time.sleep(5)
-        start_time = time.time()
+        start_time = time.monotonic()
         # Create initial connections to the admin port and level 1 stream port.
-        # Keep attempting initial connections until time_out is reached.
-        while not self._connected and time.time() - start_time <= 30:
-            self.connections["9300"].connect()
-            self.health_check()
-            time.sleep(1)
+        # Keep attempting initial connections until time_out is reached. The
+        # wait between attempts starts short and doubles up to 1 second, so a
+        # service that is ready quickly is detected quickly.
+        backoff = 0.05
+        while not self._connected and time.monotonic() - start_time <= 30:
+            if not self.connections["9300"]._connected:
+                # A socket can't be connected again after a failed attempt, so
+                # each attempt uses a new connection object.
+                self.connections["9300"].disconnect()
+                self.connections["9300"] = Connection(port=9300, name="admin")
+                self.connections["9300"].connect()
+            if self.health_check():
+                break
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 1)
 
         if not self._connected:
             log.error("Failed to connect IQFeed API. Try restarting.")
@@ -117,10 +241,13 @@ class Service:
 
             # Turns on status updates for IQFeed service on the admin port.
             self.connections["9300"].write(msg_client)
-            log.info(self.connections["9300"].read())
+            # The responses are only read to be logged.
+            if log.isEnabledFor(logging.INFO):
+                log.info("%s", self.connections["9300"].read())
             # Explicitly tell the API to connect to the DTN server.
             self.connections["9300"].write(msg_connect)
-            log.info(self.connections["9300"].read())
+            if log.isEnabledFor(logging.INFO):
+                log.info("%s", self.connections["9300"].read())
             # Connect a dummy connection to the L1 streaming port.
             self.connections["5009"].connect()
 
@@ -139,15 +266,18 @@ class Service:
         Args:
             port: (int) port number.
             name: (str) optional unique name for the connection.
+            timeout: (int) seconds before connecting or reading times out.
         Returns:
             None
         """
+        socket_options = LOOKUP_SOCKET_OPTIONS if port == 9100 else None
         if self.connections.get(name) is None:
             self.connections[name] = Connection(
                 host=self._host,
                 port=port,
                 name=name,
                 timeout=timeout,
+                socket_options=socket_options,
             )
             self.connections[name].connect()
         elif (
@@ -161,13 +291,15 @@ class Service:
                 host=self._host,
                 port=port,
                 name=name,
+                timeout=timeout,
+                socket_options=socket_options,
             )
             self.connections[name].connect()
 
         if self.connections[name]._connected:
-            log.info(f"Connection '{name}' is connected.")
+            log.info("Connection '%s' is connected.", name)
         else:
-            log.warning(f"Connection '{name}' failed.")
+            log.warning("Connection '%s' failed.", name)
 
     def health_check(self) -> bool:
         """
@@ -193,7 +325,7 @@ class Service:
                 and msg_frame.iloc[-1, 13] == msg_disconnect
             ):
                 self._connected = False
-                log.warning(f"IQFeed port 9300 STAT: {msg_frame.iloc[-1, 13]}")
+                log.warning("IQFeed port 9300 STAT: %s", msg_frame.iloc[-1, 13])
                 log.warning("IQFeed service is disconnected from port 9300.")
             else:
                 self._connected = True
@@ -209,29 +341,225 @@ class Service:
     def check_requests(self):
         """
         The IQFeed API only allows for 50 requests in a 1 second period. Use
-        this method to check the queue of request timestamps, update the queue,
-        and pause any requests as needed. This will avoid pacing violations
+        this method to spend a request credit, pausing only until the next
+        credit is available if none are left. This will avoid pacing violations
         before calling the Connection.write() method.
         """
-        REQUEST_LIMIT = 50
-        # Iterate backwards through the queue, check the seconds elapsed, sleep,
-        # and update the queue to exclude requests > 1 second ago.
-        for i in range(-1, -len(self._time_stamp_queue), -1):
-            diff_time = datetime.now() - self._time_stamp_queue[i]
-            if diff_time.total_seconds() >= 1:
-                self._time_stamp_queue = self._time_stamp_queue[i:]
-                if len(self._time_stamp_queue) >= REQUEST_LIMIT:
-                    time.sleep(1)
-                break
+        wait = self._reserve_request()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _reserve_request(self) -> float:
+        """
+        Spend a request credit and return the seconds to wait before making the
+        request. Credits may be spent before they are replenished, so requests
+        made at the same time e.g. from coroutines each wait for their own
+        credit.
+
+        Returns:
+            (float) seconds until the credit for the request is available.
+        """
+        # Replenish the credits for the time elapsed since the last request,
+        # up to the limit the API allows in a burst.
+        now = time.monotonic()
+        self._credits = min(
+            REQUEST_LIMIT,
+            self._credits + (now - self._last_refill) / CREDIT_INTERVAL,
+        )
+        self._last_refill = now
+        self._credits -= 1
+
+        # Wait for the fraction of credits that are missing.
+        return max(-self._credits * CREDIT_INTERVAL, 0)
+
+    def _get_cached(self, key: tuple) -> pd.DataFrame:
+        """
+        Return a copy of a cached lookup data frame or None if the lookup isn't
+        cached or has expired.
+
+        Args:
+            key: (tuple) of the request type and request_id.
+        """
+        cached = self._lookup_cache.get(key)
+        if cached is None or time.monotonic() >= cached[0]:
+            return None
+
+        return cached[1].copy()
+
+    def _set_cached(self, key: tuple, frame: pd.DataFrame) -> None:
+        """
+        Cache a copy of a lookup data frame for LOOKUP_CACHE_TTL seconds. Empty
+        results e.g. from a time out are not cached.
+
+        Args:
+            key: (tuple) of the request type and request_id.
+            frame: (pd.DataFrame) returned by the lookup.
+        """
+        if len(frame) > 0:
+            expiry = time.monotonic() + LOOKUP_CACHE_TTL
+            self._lookup_cache[key] = (expiry, frame.copy())
+
+        return None
+
+    def _drain_response(
+        self,
+        name: str,
+        description: str,
+        col_names: tuple,
+        request_id: str = "",
+        dtype: dict = None,
+    ) -> pd.DataFrame:
+        """
+        Read the whole response to a request written to a lookup port
+        connection and parse it into a data frame.
+
+        Args:
+            name: (str) name of the connection the request was written to.
+            description: (str) of the request for logging a time out.
+            col_names: (tuple) of the column names of the returned data frame.
+            request_id: (str) optional id the request was made with.
+            dtype: (dict) optional column types passed to _parse_messages.
+        Returns:
+            pd.DataFrame of the response. Empty if the read timed out.
+        """
+        try:
+            data = self.connections[name].read_bulk()
+        except TimeoutError:
+            log.warning("Time out exception %s.", description)
+            # Drop the connection so the rest of the response can't be read
+            # as part of the next response.
+            self.connections[name].disconnect()
+            data = b""
+
+        return self._parse_messages(
+            data,
+            col_names,
+            request_id=request_id,
+            dtype=dtype,
+        )
 
-        self._time_stamp_queue.append(datetime.now())
+    def _parse_messages(
+        self,
+        data: bytes,
+        col_names: tuple,
+        request_id: str = "",
+        dtype: dict = None,
+    ) -> pd.DataFrame:
+        """
+        Parse the messages of a lookup port response with the pandas C parser.
+        Each message is [RequestID (if specified)],[LS | LH],[fields ...] and
+        may end in a trailing comma. Only the request_id and data fields are
+        parsed. An error response is logged and returns an empty data frame.
 
-    def lookup_security_types(self, request_id: str = "") -> pd.DataFrame:
+        Args:
+            data: (bytes) messages excluding the !ENDMSG! message.
+            col_names: (tuple) of the column names of the returned data frame.
+            request_id: (str) optional id the request was made with.
+            dtype: (dict) optional column types. Numeric columns are converted
+                by the C parser into numpy arrays without creating a Python
+                object for each value. Other columns are strings.
+        Returns:
+            pd.DataFrame containing a column for each of the col_names.
+        """
+        # The response stays as bytes. Only the error codes are decoded.
+        prefix = f"{request_id},".encode("utf-8") if request_id != "" else b""
+        error_prefix = prefix + b"E,"
+        if data.startswith(error_prefix) or b"\n" + error_prefix in data:
+            # The API responds with an error instead of any data e.g. when
+            # nothing matches the request. Error messages are logged and
+            # dropped wherever they are, so that only data is parsed.
+            messages = []
+            for message in data.splitlines(keepends=True):
+                if message.startswith(error_prefix):
+                    error = message[len(error_prefix) :].split(b",")[0]
+                    log.error("IQFeed Error: %s", error.strip().decode("utf-8"))
+                else:
+                    messages.append(message)
+            data = b"".join(messages)
+        if len(data) > 0:
+            data = self._check_message_ids(data, prefix)
+        dtypes = {name: str for name in col_names}
+        dtypes.update(dtype or {})
+        if len(data) == 0:
+            # The columns have the same types as when there is data.
+            return pd.DataFrame(columns=list(col_names)).astype(dtypes)
+
+        # Fields are selected by position, so the message_id and the empty
+        # field after a trailing comma are skipped by the parser without being
+        # converted. The data fields start after the message_id and the
+        # request_id, if there is one, is the first field.
+        n_fields = len(col_names)
+        if request_id != "":
+            positions = [0, *range(2, n_fields + 1)]
+        else:
+            positions = list(range(1, n_fields + 1))
+        # Empty numeric fields are missing values, but empty strings are kept.
+        numeric = [
+            name
+            for name, kind in dtypes.items()
+            if kind not in (str, "category")
+        ]
+
+        return pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=list(col_names),
+            usecols=positions,
+            dtype=dtypes,
+            keep_default_na=False,
+            na_values={name: [""] for name in numeric},
+            quoting=csv.QUOTE_NONE,
+            engine="c",
+        )
+
+    def _check_message_ids(self, data: bytes, prefix: bytes) -> bytes:
+        """
+        Fields are parsed by position, so every message must start with the
+        request_id prefix and an LS or LH message_id. A message in any other
+        format would shift every column, so it is logged and dropped.
+
+        Args:
+            data: (bytes) messages of a lookup port response.
+            prefix: (bytes) request_id followed by a comma or empty.
+        Returns:
+            (bytes) the messages that are in the expected format.
+        """
+        # Every message normally has the same message_id, which is checked by
+        # counting in C without splitting the response.
+        message_id = data[len(prefix) : len(prefix) + 3]
+        expected = prefix + message_id
+        if (
+            message_id in (b"LS,", b"LH,")
+            and data.startswith(expected)
+            and data.count(b"\n")
+            == data.count(b"\n" + expected) + data.endswith(b"\n")
+        ):
+            return data
+
+        messages = []
+        for message in data.splitlines(keepends=True):
+            if message.startswith((prefix + b"LS,", prefix + b"LH,")):
+                messages.append(message)
+            else:
+                log.error(
+                    "Unexpected lookup message: %s",
+                    message.strip().decode("utf-8"),
+                )
+
+        return b"".join(messages)
+
+    def lookup_security_types(
+        self,
+        request_id: str = "",
+        connection_name: str = "lookup",
+    ) -> pd.DataFrame:
         """
         Query the current list of security types and their codes from the API.
 
         Args:
             request_id: (str) optional id for making unique requests to the API.
+            connection_name: (str) name of the port 9100 connection to send the
+                request on. It is connected if it doesn't exist.
 
         Returns:
             (dict) of records. Each record identifies a single security type.
@@ -239,75 +567,45 @@ class Service:
             terminated with a message in the format:
             "!ENDMSG!,\r\n"
         """
-        # Connect to port 9100, query data, then disconnect.
-        self.connection(port=9100, name="lookup")
+        sec_types = self._get_cached(("SST", request_id))
+        if sec_types is not None:
+            return sec_types
+
+        # Connect to port 9100 or reuse the existing lookup connection.
+        self.connection(port=9100, name=connection_name)
 
         if request_id == "":
             msg_req = "SST\r\n"
+            col_names = SECURITY_TYPES_COLUMNS
         else:
             msg_req = f"SST,{request_id}\r\n"
+            col_names = ("request_id", *SECURITY_TYPES_COLUMNS)
 
         self.check_requests()
-        self.connections["lookup"].write(msg_req)
-        # This is what is received from the API. The \n char is removed when the
-        # data is processed and split on new line characters.
-        # --------------------------
-        # [RequestID (if specified)],
-        # LS,
-        # [Security Type ID],
-        # [Short Name],
-        # [Long Name],\r\n
-        col_names = [
-            "request_id",
-            "sec_type_id",
-            "short_name",
-            "long_name",
-        ]
-        if request_id == "":
-            del col_names[0]
+        self.connections[connection_name].write(msg_req)
 
-        sec_types = list()
-        queue = True
-        while queue:
-            try:
-                messages = self.connections["lookup"].read()
-            except TimeoutError:
-                log.warning("Time out exception in lookup_security_types.")
-                break
-
-            for message in messages:
-                if message == "!ENDMSG!,\r":
-                    queue = False
-                    break
-                elif message == "":
-                    continue
-                else:
-                    split_message = message.split(",")
-                    if split_message[-1] == "\r":
-                        # Drop carriage return '\r' character.
-                        del split_message[-1]
-
-                    if split_message[0] == request_id:
-                        # Drop unneccessary request_id element of message.
-                        del split_message[0]
-
-                    if split_message[0] == "LS":
-                        # Drop unnecessary message_id element of message.
-                        del split_message[0]
-
-                    sec_types.append(split_message)
-
-        self.connections["lookup"].disconnect()
-        sec_types = pd.DataFrame(sec_types, columns=col_names)
+        sec_types = self._drain_response(
+            name=connection_name,
+            description="lookup_security_types",
+            col_names=col_names,
+            request_id=request_id,
+        )
+        self._set_cached(("SST", request_id), sec_types)
 
         return sec_types
 
-    def lookup_market_types(self, request_id: str = "") -> pd.DataFrame:
+    def lookup_market_types(
+        self,
+        request_id: str = "",
+        connection_name: str = "lookup",
+    ) -> pd.DataFrame:
         """
         Query the current list of market types and their codes from the API.
 
         Args:
             request_id: (str) optional id for making unique requests to the API.
+            connection_name: (str) name of the port 9100 connection to send the
+                request on. It is connected if it doesn't exist.
 
         Returns:
             (dict) of market types. Each record identifies a single listed
@@ -315,71 +613,32 @@ class Service:
             by the API, the list is terminated with a message in the format:
             "!ENDMSG!,\r\n"
         """
-        # Connect to port 9100, query data, then disconnect.
-        self.connection(port=9100, name="lookup")
+        mkt_types = self._get_cached(("SLM", request_id))
+        if mkt_types is not None:
+            return mkt_types
+
+        # Connect to port 9100 or reuse the existing lookup connection.
+        self.connection(port=9100, name=connection_name)
 
         if request_id == "":
             msg_req = "SLM\r\n"
+            col_names = MARKET_TYPES_COLUMNS
         else:
             msg_req = f"SLM,{request_id}\r\n"
+            col_names = ("request_id", *MARKET_TYPES_COLUMNS)
 
         self.check_requests()
-        log.info(f"API request lookup port 9100: {msg_req}")
-        self.connections["lookup"].write(msg_req)
-        # This is what is received from the API. The \n char is removed when the
-        # data is processed and split on new line characters.
-        # --------------------------
-        # [RequestID (if specified)],
-        # LS,
-        # [Listed Market ID],
-        # [Short Name],
-        # [Long Name],
-        # [Group ID],
-        # [Short Group Name]\r\n
-        col_names = [
-            "request_id",
-            "listed_market_id",
-            "short_name",
-            "long_name",
-            "group_id",
-            "short_group_name",
-        ]
-        if request_id == "":
-            del col_names[0]
-
-        mkt_types = list()
-        queue = True
-        while queue:
-            try:
-                messages = self.connections["lookup"].read()
-            except TimeoutError:
-                log.warning("Time out exception in lookup_market_types.")
-                break
-
-            for message in messages:
-                if message == "!ENDMSG!,\r":
-                    queue = False
-                    break
-                elif message == "":
-                    continue
-                else:
-                    split_message = message.split(",")
-                    if split_message[-1] == "\r":
-                        # Drop carriage return '\r' character.
-                        del split_message[-1]
-
-                    if split_message[0] == request_id:
-                        # Drop unneccessary request_id element of message.
-                        del split_message[0]
-
-                    if split_message[0] == "LS":
-                        # Drop unnecessary message_id element of message.
-                        del split_message[0]
-
-                    mkt_types.append(split_message)
-
-        self.connections["lookup"].disconnect()
-        mkt_types = pd.DataFrame(mkt_types, columns=col_names)
+        log.info("API request lookup port 9100: %s", msg_req)
+        self.connections[connection_name].write(msg_req)
+
+        mkt_types = self._drain_response(
+            name=connection_name,
+            description="lookup_market_types",
+            col_names=col_names,
+            request_id=request_id,
+            dtype=MARKET_TYPES_DTYPES,
+        )
+        self._set_cached(("SLM", request_id), mkt_types)
 
         return mkt_types
 
@@ -391,6 +650,7 @@ class Service:
         field_to_search: str = "s",
         request_id: str = "",
         symbol_root: str = None,
+        connection_name: str = "lookup",
     ) -> pd.DataFrame:
         """
         This uses the SBF 'search by filter' functionality that IQFeed offers.
@@ -405,13 +665,157 @@ class Service:
             field_to_search: (str) symbols 's' or descriptions with 'd'.
             request_id: (str) optional id for making unique requests to the API.
             symbol_root: (str) optional symbol to filter results further.
+            connection_name: (str) name of the port 9100 connection to send the
+                request on. It is connected if it doesn't exist.
 
         Returns:
             pd.DataFrame of the symbols needed for initiating L1 / L2 streams.
         """
+        # Connect to port 9100 or reuse the existing lookup connection.
+        self.connection(port=9100, name=connection_name)
+
+        msg_search = self._symbol_search_message(
+            search_str=search_str,
+            listed_market_id=listed_market_id,
+            security_type_id=security_type_id,
+            field_to_search=field_to_search,
+            request_id=request_id,
+        )
+        if request_id == "":
+            col_names = SYMBOLS_COLUMNS
+        else:
+            col_names = ("request_id", *SYMBOLS_COLUMNS)
+
+        self.check_requests()
+        log.info("API request lookup port 9100 message: %s", msg_search)
+        self.connections[connection_name].write(msg_search)
+
+        symbols = self._drain_response(
+            name=connection_name,
+            description=f"lookup_symbol {search_str}",
+            col_names=col_names,
+            request_id=request_id,
+            dtype=SYMBOLS_DTYPES,
+        )
+
+        if symbol_root is not None:
+            symbols = self._filter_symbol_root(symbols, symbol_root)
+
+        return symbols
+
+    async def lookup_symbols_many(
+        self,
+        search_strs: list,
+        listed_market_id: str = None,
+        security_type_id: str = None,
+        field_to_search: str = "s",
+        filter_root: bool = False,
+        max_connections: int = 10,
+    ) -> pd.DataFrame:
+        """
+        Search for many symbols at once e.g. every contract root in the config.
+        Each search is made the same way as lookup_symbol, but the searches
+        are spread over several lookup connections, which are read
+        concurrently. Requests are still paced to the API limit.
+
+        Usage:
+            symbols = asyncio.run(service.lookup_symbols_many(["@ES", "@NQ"]))
+
+        Args:
+            search_strs: (list) of the search strings.
+            listed_market_id: (str) the market id returned from market_types.
+            security_type_id: (str) security type id from the API lookup method.
+            field_to_search: (str) symbols 's' or descriptions with 'd'.
+            filter_root: (bool) filter the results of each search to contracts
+                of the search string the same as lookup_symbol's symbol_root.
+            max_connections: (int) maximum number of lookup connections.
+        Returns:
+            pd.DataFrame of the symbols found by all of the searches.
+        """
+        if len(search_strs) == 0:
+            return self._parse_messages(
+                b"", SYMBOLS_COLUMNS, dtype=SYMBOLS_DTYPES
+            )
+
+        # Every worker takes the next search from the same iterator until none
+        # are left.
+        searches = iter(search_strs)
+
+        async def search_worker() -> list:
+            connection = AsyncConnection(port=9100, host=self._host, timeout=7)
+            results = []
+            try:
+                await connection.connect()
+                if not connection._connected:
+                    return results
+
+                for search_str in searches:
+                    msg_search = self._symbol_search_message(
+                        search_str=search_str,
+                        listed_market_id=listed_market_id,
+                        security_type_id=security_type_id,
+                        field_to_search=field_to_search,
+                    )
+                    await asyncio.sleep(self._reserve_request())
+                    await connection.write(msg_search)
+                    try:
+                        data = await connection.read_bulk()
+                    except TimeoutError:
+                        # The remaining searches are left to the other workers.
+                        log.warning(
+                            "Time out exception lookup_symbol %s.", search_str
+                        )
+                        break
+
+                    symbols = self._parse_messages(
+                        data,
+                        SYMBOLS_COLUMNS,
+                        dtype=SYMBOLS_DTYPES,
+                    )
+                    if filter_root:
+                        symbols = self._filter_symbol_root(symbols, search_str)
+                    results.append(symbols)
+            finally:
+                await connection.disconnect()
+
+            return results
+
+        n_workers = max(min(len(search_strs), max_connections), 1)
+        # Wait for every worker to close its connection before raising an
+        # error from any of them.
+        results = await asyncio.gather(
+            *(search_worker() for _ in range(n_workers)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        frames = [symbols for result in results for symbols in result]
+        if len(frames) == 0:
+            return self._parse_messages(
+                b"", SYMBOLS_COLUMNS, dtype=SYMBOLS_DTYPES
+            )
+
+        return pd.concat(frames, ignore_index=True)
+
+    def _symbol_search_message(
+        self,
+        search_str: str,
+        listed_market_id: str = None,
+        security_type_id: str = None,
+        field_to_search: str = "s",
+        request_id: str = "",
+    ) -> str:
+        """
+        Build the SBF 'search by filter' request message. See lookup_symbol.
+
+        Returns:
+            (str) request message for the lookup port.
+        """
         # Can filter by market or security type.
         if listed_market_id is not None and security_type_id is not None:
             log.error("Can't filter symbols by market_name and security_type.")
+            filter_type, filter_value = "", ""
         elif listed_market_id is not None:
             filter_type = "e"
             filter_value = listed_market_id
@@ -421,78 +825,34 @@ class Service:
         else:
             filter_type, filter_value = "", ""
 
-        # Connect to port 9100, query data, then disconnect.
-        self.connection(port=9100, name="lookup")
-
         # Search string passed to the API is a csv of search elements.
-        msg_search = [
-            "SBF",
-            field_to_search,
-            search_str,
-            filter_type,
-            filter_value,
-            request_id,
-        ]
-        col_names = [
-            "request_id",
-            "symbol",
-            "listed_market_id",
-            "sec_type_id",
-            "description",
-        ]
-        if request_id == "":
-            del col_names[0]
-
-        msg_search = ",".join(msg_search) + "\r\n"
-        self.check_requests()
-        log.info("API request lookup port 9100 message: {msg_search}")
-        self.connections["lookup"].write(msg_search)
-
-        symbols = list()
-        queue = True
-        while queue:
-            try:
-                messages = self.connections["lookup"].read()
-            except TimeoutError:
-                log.warning(f"Time out exception lookup_symbol {search_str}.")
-                break
-
-            for message in messages:
-                if message == "!ENDMSG!,\r":
-                    queue = False
-                    break
-                elif message == "":
-                    continue
-                else:
-                    split_message = message.split(",")
-                    if split_message[-1] == "\r":
-                        # Drop carriage return '\r' character.
-                        del split_message[-1]
-
-                    if split_message[0] == request_id:
-                        # Drop unneccessary request_id element of message.
-                        del split_message[0]
-
-                    if split_message[0] == "LS":
-                        # Drop unnecessary message_id element of message.
-                        del split_message[0]
-
-                    symbols.append(split_message)
+        return (
+            f"SBF,{field_to_search},{search_str},{filter_type},{filter_value},"
+            f"{request_id}\r\n"
+        )
 
-        self.connections["lookup"].disconnect()
-        symbols = pd.DataFrame(symbols, columns=col_names)
+    def _filter_symbol_root(
+        self,
+        symbols: pd.DataFrame,
+        symbol_root: str,
+    ) -> pd.DataFrame:
+        """
+        Filter symbols down to the contracts of a symbol root e.g. @ESH25 for
+        the root @ES.
 
-        if symbol_root is not None:
-            # The +3 is for the single character month code and 2 digit year.
-            # This filters out symbols that are a superset of the symbol_root.
-            symbols = symbols.loc[
-                (
-                    symbols.symbol.str.contains(symbol_root)
-                    & (symbols.symbol.str.len() == len(symbol_root) + 3)
-                )
-            ]
+        Args:
+            symbols: (pd.DataFrame) returned by a symbol search.
+            symbol_root: (str) root symbol of the contracts.
+        Returns:
+            pd.DataFrame of the symbols that are contracts of the root.
+        """
+        # The +3 is for the single character month code and 2 digit year.
+        # This filters out symbols that are a superset of the symbol_root.
+        # A plain prefix test avoids compiling the root as a regex.
+        starts = symbols.symbol.str.startswith(symbol_root)
+        lengths = symbols.symbol.str.len() == len(symbol_root) + 3
 
-        return symbols
+        return symbols.loc[(starts & lengths).to_numpy(dtype=bool)]
 
     def query_historical(
         self,
@@ -528,43 +888,21 @@ class Service:
             pts_per_send = 1024
         if len(time_end) == 0:
             # Default is to query all data up through current.
-            time_end = str(datetime.now()).split(".")[0]
-            time_end = time_end.replace("-", "").replace(":", "")
+            time_end = time.strftime(TIME_FORMAT)
 
         if query_type == "trades":
             # See https://www.iqfeed.net/dev/api/docs/HistoricalviaTCPIP.cfm
-            msg = f"HTT,{symbol},{time_start},{time_end},,,,,,"
-            # Add DatapointsPerSend to the msg string.
-            msg += f"{pts_per_send}\r\n"
-            col_names = [
-                "time_stamp",
-                "last",
-                "last_size",
-                "total_volume",
-                "bid",
-                "ask",
-                "tick_id",
-                "basis_for_last",
-                "trade_market_center",
-                "trade_conditions",
-                "trade_aggressor",
-                "day_code",
-            ]
+            # The last field is DatapointsPerSend.
+            msg = (
+                f"HTT,{symbol},{time_start},{time_end},,,,,,{pts_per_send}\r\n"
+            )
         elif query_type == "interval":
             # HIT,symbol,[interval in seconds],time_start,time_end,
-            msg = f"HIT,{symbol},{time_interval},{time_start},{time_end},,,,,,"
-            # Add DatapointsPerSend to the msg string.
-            msg += f"{pts_per_send}\r\n"
-            col_names = [
-                "time_stamp",
-                "high",
-                "low",
-                "open",
-                "close",
-                "total_volume",
-                "period_volume",
-                "number_of_trades",
-            ]
+            # The last field is DatapointsPerSend.
+            msg = (
+                f"HIT,{symbol},{time_interval},{time_start},{time_end},,,,,,"
+                f"{pts_per_send}\r\n"
+            )
         else:
             log.error("query_type must be one of [trades, interval].")
 
@@ -572,49 +910,39 @@ class Service:
         self.check_requests()
         self.connections["historical"].write(msg)
 
-        data_hist = list()
-        queue = True
-        while queue:
-            try:
-                messages = self.connections["historical"].read()
-            except TimeoutError:
-                log.warning(f"Time out exception query_historical {symbol}.")
-                break
-
-            for message in messages:
-                if message == "!ENDMSG!,\r":
-                    queue = False
-                    break
-                elif message == "":
-                    continue
-                else:
-                    split_message = message.split(",")
-                    if split_message[-1] == "\r":
-                        del split_message[-1]
-
-                    if split_message[0] == "":
-                        # Delete unnecessary request_id part of message.
-                        del split_message[0]
-
-                    if split_message[0] == "LH":
-                        # Delete unnecessary message_id part of message.
-                        del split_message[0]
-
-                    data_hist.append(split_message)
-
-        self.connections["historical"].disconnect()
-        data_hist = pd.DataFrame(data_hist, columns=col_names)
+        data_hist = self._drain_response(
+            name="historical",
+            description=f"query_historical {symbol}",
+            col_names=HISTORICAL_COLUMNS[query_type],
+            dtype=HISTORICAL_DTYPES[query_type],
+        )
+        data_hist["time_stamp"] = pd.to_datetime(
+            data_hist.time_stamp,
+            format=HISTORICAL_TIME_FORMATS[query_type],
+        )
 
         return data_hist
 
+    def close_lookup(self):
+        """
+        Disconnect the lookup and historical connections to port 9100. These
+        are kept open between requests to avoid connecting for every request.
+        """
+        for name in ["lookup", "historical"]:
+            if self.connections.get(name) is not None:
+                self.connections[name].disconnect()
+
     def shutdown(self):
         """
         Shutdown IQFeed by disconnecting from all existing connections. After
         all connections that were made to the Level 1 Port are disconnected,
         IQConnect will shut down 5s after the last connection is terminated.
         """
-        for key in self.connections.keys():
-            self.connections[key].disconnect()
+        # Close every connection at once. The values are copied first in case
+        # the connections are changed while they are being closed.
+        connections = list(self.connections.values())
+        with ThreadPoolExecutor(max_workers=max(len(connections), 1)) as pool:
+            list(pool.map(Connection.disconnect, connections))
 
         time.sleep(5)
         log.info("Shutdown IQFeed service.")
@@ -0,0 +1,30 @@
+from iqfeed import Connection
+import selectors
+import socket
+
+"""
+Helpers for testing connections without IQConnect. A socketpair stands in for
+the TCP connection and the test writes to the other end of it as the API.
+"""
+
+
+def connected_pair(port: int, name: str = "") -> tuple:
+    """
+    Create a Connection whose socket is one end of a socketpair.
+
+    Args:
+        port: (int) IQFeed port the connection behaves as e.g. 5009 or 9100.
+        name: (str) optional name for the connection.
+    Returns:
+        (tuple) of the connected Connection and the socket of the API end.
+    """
+    connection = Connection(port=port, name=name, timeout=1)
+    # Close the unconnected TCP socket and read from the socketpair instead.
+    connection.disconnect()
+    connection.connection, peer = socket.socketpair()
+    connection._send = connection.connection.sendall
+    connection._selector = selectors.DefaultSelector()
+    connection._selector.register(connection.connection, selectors.EVENT_READ)
+    connection._connected = True
+
+    return connection, peer
@@ -0,0 +1,82 @@
+from iqfeed import AsyncConnection
+import asyncio
+import socket
+import unittest
+
+"""
+Test AsyncConnection reads against a socketpair, which doesn't need IQConnect.
+"""
+
+
+async def _connected_pair(port: int) -> tuple:
+    """
+    Create an AsyncConnection whose streams are one end of a socketpair.
+
+    Returns:
+        (tuple) of the connected AsyncConnection and the socket of the API end.
+    """
+    connection = AsyncConnection(port=port, timeout=1)
+    ours, peer = socket.socketpair()
+    connection._reader, connection._writer = await asyncio.open_connection(
+        sock=ours
+    )
+    connection._connected = True
+
+    return connection, peer
+
+
+class TestAsyncConnection(unittest.TestCase):
+    def test_read_until(self):
+        """
+        The first frame matching the predicate is returned and the frames
+        received before it are kept for the next read().
+        """
+
+        async def read_until():
+            connection, peer = await _connected_pair(port=9100)
+            peer.sendall(b"S,ONE\nS,CURRENT PROTOCOL,6.2\nS,TWO\n")
+            frame = await connection._read_until(
+                lambda frame: frame.startswith(b"S,CURRENT PROTOCOL,")
+            )
+            pending = await connection.read()
+            await connection.disconnect()
+            peer.close()
+            return frame, pending
+
+        frame, pending = asyncio.run(read_until())
+        self.assertEqual(frame, "S,CURRENT PROTOCOL,6.2")
+        self.assertEqual(pending, ["S,ONE", "S,TWO"])
+
+    def test_read_until_closed(self):
+        """
+        A connection closed by the API before the frame arrives returns None
+        and is no longer connected.
+        """
+
+        async def read_until():
+            connection, peer = await _connected_pair(port=9100)
+            peer.sendall(b"S,ONE\n")
+            peer.close()
+            frame = await connection._read_until(
+                lambda frame: frame.startswith(b"S,CURRENT PROTOCOL,")
+            )
+            return frame, connection._connected
+
+        frame, connected = asyncio.run(read_until())
+        self.assertIsNone(frame)
+        self.assertFalse(connected)
+
+    def test_read_bulk(self):
+        async def read_bulk():
+            connection, peer = await _connected_pair(port=9100)
+            peer.sendall(b"1,LS,A,\r\n1,LS,B,\r\n1,!ENDMSG!,\r\n")
+            data = await connection.read_bulk()
+            await connection.disconnect()
+            peer.close()
+            return data
+
+        self.assertEqual(asyncio.run(read_bulk()), b"1,LS,A,\r\n1,LS,B,\r\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
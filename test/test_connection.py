@@ -0,0 +1,156 @@
+from iqfeed import Connection
+from iqfeed import Service
+from test.helpers import connected_pair
+import pandas as pd
+import unittest
+
+"""
+Test Connection reads against a socketpair, which doesn't need IQConnect.
+"""
+
+
+class TestConnection(unittest.TestCase):
+    def test_read_bulk(self):
+        """
+        Read a lookup response up to the terminating message, which is dropped.
+        """
+        connection, peer = connected_pair(port=9100)
+        peer.sendall(b"LS,1,A,\r\nLS,2,B,\r\n")
+        peer.sendall(b"LS,3,C,\r\n!ENDMSG!,\r\n")
+        data = connection.read_bulk()
+        self.assertEqual(data, b"LS,1,A,\r\nLS,2,B,\r\nLS,3,C,\r\n")
+        self.assertTrue(connection._connected)
+        connection.disconnect()
+        peer.close()
+
+    def test_read_bulk_closed(self):
+        """
+        A connection closed by the API before the end of a response returns
+        what was received and is no longer connected.
+        """
+        connection, peer = connected_pair(port=9100)
+        peer.sendall(b"LS,1,A,\r\n")
+        peer.close()
+        self.assertEqual(connection.read_bulk(), b"LS,1,A,\r\n")
+        self.assertFalse(connection._connected)
+
+    def test_read_responses_error(self):
+        """
+        An error in reply to a batched command raises straight away instead of
+        waiting for the responses that will never arrive.
+        """
+        connection, peer = connected_pair(port=5009)
+        peer.sendall(b"S,CURRENT PROTOCOL,6.2\r\nE,!SYNTAX_ERROR!,\r\n")
+        with self.assertRaisesRegex(ConnectionError, "!SYNTAX_ERROR!"):
+            connection._read_responses(
+                prefixes=(b"S,CURRENT PROTOCOL,", b"S,FUNDAMENTAL FIELDNAMES,"),
+                raise_errors=True,
+            )
+        connection.disconnect()
+        peer.close()
+
+    def test_read_responses_closed(self):
+        """
+        A connection closed by the API before every response arrives returns
+        the responses received so far and is no longer connected.
+        """
+        connection, peer = connected_pair(port=5009)
+        peer.sendall(b"S,CURRENT PROTOCOL,6.2\r\n")
+        peer.close()
+        responses = connection._read_responses(
+            prefixes=(b"S,CURRENT PROTOCOL,", b"S,FUNDAMENTAL FIELDNAMES,"),
+        )
+        self.assertEqual(
+            responses, {b"S,CURRENT PROTOCOL,": "S,CURRENT PROTOCOL,6.2\r"}
+        )
+        self.assertFalse(connection._connected)
+
+    def test_process_admin_errors(self):
+        """
+        Errors on the admin port are logged and a buffer without errors logs
+        nothing.
+        """
+        connection = Connection(port=9300)
+        with self.assertLogs("iqfeed.connection", "ERROR") as logs:
+            connection._process_admin(buffer=b"S,STATS,1\nE,!ERROR!,\n")
+        self.assertEqual(
+            logs.output, ["ERROR:iqfeed.connection:IQFeed Error: !ERROR!"]
+        )
+        with self.assertNoLogs("iqfeed.connection", "ERROR"):
+            connection._process_admin(buffer=b"S,STATS,1\nS,STATS,2\n")
+        connection.disconnect()
+
+    def test_service_reconnects_closed(self):
+        """
+        Service.connection() replaces a lookup connection closed by the API
+        instead of reusing it.
+        """
+        service = Service()
+        connection, peer = connected_pair(port=9100, name="lookup")
+        service.connections["lookup"] = connection
+        peer.close()
+        lookup = service._drain_response(
+            name="lookup",
+            description="test",
+            col_names=("sec_type_id", "short_name", "long_name"),
+        )
+        self.assertEqual(len(lookup), 0)
+        self.assertFalse(connection._connected)
+
+        service.connection(port=9100, name="lookup")
+        self.assertIsNot(service.connections["lookup"], connection)
+        service.connections["lookup"].disconnect()
+
+
+class TestProcessStream(unittest.TestCase):
+    def setUp(self):
+        self.connection = Connection(port=5009)
+        self.connection._update_fieldnames = [
+            "Symbol",
+            "Most Recent Trade",
+            "Message Contents",
+        ]
+
+    def tearDown(self):
+        self.connection.disconnect()
+
+    def test_updates(self):
+        """
+        A buffer of only update messages is parsed into the update fieldnames
+        with numeric fields as float64.
+        """
+        stream_data = self.connection.process_stream(
+            buffer=b"Q,@ESH25,4500.25,Cba,\nQ,@ESH25,,C,\n"
+        )
+        self.assertEqual(
+            list(stream_data.columns),
+            self.connection._update_fieldnames,
+        )
+        self.assertEqual(stream_data["Most Recent Trade"].dtype, "float64")
+        self.assertEqual(stream_data["Most Recent Trade"].iat[0], 4500.25)
+        self.assertTrue(pd.isna(stream_data["Most Recent Trade"].iat[1]))
+
+    def test_mixed_messages(self):
+        """
+        Other messages in the buffer are dropped and quoted fields keep their
+        commas.
+        """
+        stream_data = self.connection.process_stream(
+            buffer=b'T,20240102 10:00:00\nQ,"@ES,H25",4500.25,Cba,\n'
+        )
+        self.assertEqual(len(stream_data), 1)
+        self.assertEqual(stream_data["Symbol"].iat[0], "@ES,H25")
+
+    def test_no_updates(self):
+        stream_data = self.connection.process_stream(
+            buffer=b"T,20240102 10:00:00\n"
+        )
+        self.assertEqual(len(stream_data), 0)
+        self.assertEqual(
+            list(stream_data.columns),
+            self.connection._update_fieldnames,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
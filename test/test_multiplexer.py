@@ -0,0 +1,71 @@
+from iqfeed import StreamingMultiplexer
+from test.helpers import connected_pair
+import time
+import unittest
+
+"""
+Test StreamingMultiplexer with socketpair connections, which don't need
+IQConnect.
+"""
+
+
+class TestStreamingMultiplexer(unittest.TestCase):
+    def setUp(self):
+        self.first, self.first_peer = connected_pair(port=9100, name="first")
+        self.second, self.second_peer = connected_pair(port=9100, name="second")
+        self.multiplexer = StreamingMultiplexer([self.first, self.second])
+
+    def tearDown(self):
+        self.multiplexer.close()
+        for connection in [self.first, self.second]:
+            connection.disconnect()
+        for peer in [self.first_peer, self.second_peer]:
+            peer.close()
+
+    def test_poll(self):
+        self.first_peer.sendall(b"S,ONE\r\n")
+        self.second_peer.sendall(b"S,TWO\r\n")
+        results = self.multiplexer.poll(timeout=1)
+        self.assertEqual(
+            sorted(data for _, data in results),
+            [["S,ONE\r"], ["S,TWO\r"]],
+        )
+
+    def test_poll_partial_message(self):
+        """
+        A connection that has only sent part of a message doesn't block the
+        other connections, and the rest of the message is returned later.
+        """
+        self.first_peer.sendall(b"S,PAR")
+        self.second_peer.sendall(b"S,TWO\r\n")
+        start = time.monotonic()
+        results = self.multiplexer.poll(timeout=1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(results, [(self.second, ["S,TWO\r"])])
+
+        self.first_peer.sendall(b"TIAL\r\n")
+        results = self.multiplexer.poll(timeout=1)
+        self.assertEqual(results, [(self.first, ["S,PARTIAL\r"])])
+
+    def test_poll_timeout(self):
+        self.first_peer.sendall(b"S,PAR")
+        self.assertEqual(self.multiplexer.poll(timeout=0.1), [])
+
+    def test_poll_closed(self):
+        """
+        A connection closed by the API is unregistered and the other
+        connections are still read.
+        """
+        self.first_peer.close()
+        self.second_peer.sendall(b"S,TWO\r\n")
+        results = []
+        while len(results) == 0:
+            results = self.multiplexer.poll(timeout=1)
+        self.assertEqual(results, [(self.second, ["S,TWO\r"])])
+        self.multiplexer.poll(timeout=0.1)
+        self.assertFalse(self.first._connected)
+        self.assertEqual(len(self.multiplexer._selector.get_map()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
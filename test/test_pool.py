@@ -0,0 +1,91 @@
+from iqfeed import ConnectionPool
+from test.helpers import connected_pair
+import time
+import unittest
+
+"""
+Test ConnectionPool with socketpair connections, which don't need IQConnect.
+"""
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_release_and_acquire(self):
+        """
+        A released connection is handed out again for the same host:port.
+        """
+        pool = ConnectionPool()
+        connection, peer = connected_pair(port=9100)
+        pool.release(connection)
+        self.assertIs(pool.acquire(port=9100), connection)
+        pool.release(connection)
+        pool.close()
+        peer.close()
+
+    def test_with_block_releases(self):
+        """
+        Leaving a with block returns the connection to the pool.
+        """
+        pool = ConnectionPool()
+        connection, peer = connected_pair(port=9100)
+        pool.release(connection)
+        with pool.acquire(port=9100) as lookup:
+            self.assertIs(lookup, connection)
+        self.assertTrue(connection._connected)
+        self.assertIs(pool.acquire(port=9100), connection)
+        pool.close()
+        peer.close()
+
+    def test_with_block_error_disconnects(self):
+        """
+        A with block that raises disconnects the connection instead of
+        returning it to the pool with part of a response unread.
+        """
+        pool = ConnectionPool()
+        connection, peer = connected_pair(port=9100)
+        pool.release(connection)
+        with self.assertRaises(TimeoutError):
+            with pool.acquire(port=9100):
+                raise TimeoutError("Read timed out")
+        self.assertFalse(connection._connected)
+        self.assertEqual(len(pool._idle[("127.0.0.1", 9100)]), 0)
+        peer.close()
+
+    def test_expired_connection(self):
+        """
+        A connection that has been idle longer than the timeout is
+        disconnected instead of being handed out again.
+        """
+        pool = ConnectionPool(timeout=0)
+        connection, peer = connected_pair(port=9100)
+        pool.release(connection)
+        time.sleep(0.01)
+        acquired = pool.acquire(port=9100)
+        self.assertIsNot(acquired, connection)
+        self.assertFalse(connection._connected)
+        acquired.disconnect()
+        peer.close()
+
+    def test_release_disconnected(self):
+        """
+        A connection that is no longer connected is dropped by release().
+        """
+        pool = ConnectionPool()
+        connection, peer = connected_pair(port=9100)
+        connection.disconnect()
+        pool.release(connection)
+        self.assertEqual(len(pool._idle[("127.0.0.1", 9100)]), 0)
+        peer.close()
+
+    def test_close(self):
+        pool = ConnectionPool()
+        pairs = [connected_pair(port=9100) for _ in range(2)]
+        for connection, _ in pairs:
+            pool.release(connection)
+        pool.close()
+        for connection, peer in pairs:
+            self.assertFalse(connection._connected)
+            peer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
+import asyncio
 import iqfeed.config as config
 from iqfeed import Connection
+from iqfeed import ConnectionPool
 from iqfeed import Service
+import pandas as pd
 import time
 import unittest
 
@@ -11,20 +14,73 @@ issues with starting the service twice in quick succession for unit testing.
 """
 
 
-class TestService(unittest.TestCase):
+def _row_exists(df: pd.DataFrame, row: dict) -> bool:
+    """
+    Check whether any row of the DataFrame holds all of the values in the row
+    dict, without converting the DataFrame to a list of records.
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, value in row.items():
+        mask &= df[column].astype(str) == value
+
+    return bool(mask.any())
+
+
+def _check_one(
+    search_results: pd.DataFrame,
+    symbol: str,
+    listed_market_id: str,
+) -> bool:
+    """
+    Check that the symbol search results hold a contract of the futures symbol
+    in config.py. Target symbol length is the root + 3 for the month and year
+    code. For example, @ES is the root and + 3 for the target MYY.
+    """
+    root = symbol[:-2]
+    # Filter in a single pass to the contracts of the root and listed_market_id,
+    # drop results with '#' which represents front months back adjusted
+    # continuous contracts, keep contract symbols of the expected length, and
+    # drop empty descriptions.
+    search_result = search_results[
+        search_results.symbol.str.startswith(root)
+        & (search_results.listed_market_id == listed_market_id)
+        & ~search_results.symbol.str.contains("#", regex=False)
+        & (search_results.symbol.str.len() == len(root) + 3)
+        & (search_results.description.str.len() > 0)
+    ]
+
+    return len(search_result) > 0
+
+
+def setUpModule():
+    """
+    Launch the IQFeed service once for all of the test cases in the module.
+    """
+    global iqfeed_service
+    iqfeed_service = Service()
+    iqfeed_service.launch()
+
+
+def tearDownModule():
+    time.sleep(5)  # Necessary pause.
+
+
+class TestLifecycle(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """
-        Set up the IQFeed service for all of the unit test methods.
+        Share the IQFeed service and a pool of test connections with the
+        connection tests.
         """
-        cls.iqfeed_service = Service()
-        cls.iqfeed_service.launch()
+        cls.iqfeed_service = iqfeed_service
+        # Connections to the L1 port shared by the connection tests.
+        cls._pool = ConnectionPool()
         super().setUpClass()
 
     @classmethod
     def tearDownClass(cls):
+        cls._pool.close()
         super().tearDownClass()
-        time.sleep(5)  # Necessary pause.
 
     def test_00_launch(self):
         """
@@ -40,26 +96,24 @@ class TestService(unittest.TestCase):
     def test_02_connect(self):
         """
         Test creating a single connection to the IQFeed Service L1 stream port.
+        The connection is returned to the pool for reuse by the next test.
         """
-        test_connection = Connection(
+        with self._pool.acquire(
             host="127.0.0.1",
             port=5009,
             name="test_connection",
-        )
-        test_connection.connect()
-        self.assertTrue(test_connection._connected)
-        test_connection.disconnect()
+        ) as test_connection:
+            self.assertTrue(test_connection._connected)
 
     def test_03_disconnect(self):
         """
         Test the disconnection method by disconnecting a test connection.
         """
-        test_connection = Connection(
+        test_connection = self._pool.acquire(
             host="127.0.0.1",
             port=5009,
             name="test_connection",
         )
-        test_connection.connect()
         test_connection.disconnect()
         self.assertFalse(test_connection._connected)
 
@@ -67,16 +121,40 @@ class TestService(unittest.TestCase):
         self.iqfeed_service.connections["9300"].disconnect()
         self.assertFalse(self.iqfeed_service.health_check())
 
+
+class TestLookup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Share the IQFeed service and the security and market types with the
+        lookup tests. Every lookup test sends its requests on the same
+        lookup_test connection.
+        """
+        cls.iqfeed_service = iqfeed_service
+        cls._sec_types = cls.iqfeed_service.lookup_security_types(
+            connection_name="lookup_test",
+        )
+        cls._mkt_types = cls.iqfeed_service.lookup_market_types(
+            connection_name="lookup_test",
+        )
+        cls._sec_type_map = dict(
+            zip(cls._sec_types.short_name, cls._sec_types.sec_type_id)
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.iqfeed_service.connections["lookup_test"].disconnect()
+        super().tearDownClass()
+
     def test_05_lookup_security_types(self):
         subset_dict = {
             "sec_type_id": "8",
             "short_name": "FUTURE",
             "long_name": "Future",
         }
-        sec_types = self.iqfeed_service.lookup_security_types()
-
         # Assert that subset dict is a subset of the sec_types dict.
-        self.assertTrue(subset_dict in sec_types.to_dict("records"))
+        self.assertTrue(_row_exists(self._sec_types, subset_dict))
 
     def test_06_lookup_market_types(self):
         subset_dict = {
@@ -84,11 +162,9 @@ class TestService(unittest.TestCase):
             "short_name": "CBOE",
             "long_name": "Chicago Board Options Exchange",
         }
-        mkt_types = self.iqfeed_service.lookup_market_types()
-        mkt_types = mkt_types[["listed_market_id", "short_name", "long_name"]]
 
         # Assert that subset dict is a subset of the mkt_types dict.
-        self.assertTrue(subset_dict in mkt_types.to_dict("records"))
+        self.assertTrue(_row_exists(self._mkt_types, subset_dict))
 
     def test_07_lookup_symbol_forex(self):
         """
@@ -101,18 +177,16 @@ class TestService(unittest.TestCase):
             "sec_type_id": "16",
             "description": "FXCM USD JPY SPO",
         }
-        sec_types = self.iqfeed_service.lookup_security_types()
         # Get the security type code and search for FOREX symbols.
-        security_type_id = sec_types.loc[
-            sec_types.short_name == "FOREX", "sec_type_id"
-        ].to_string(header=False, index=False)
+        security_type_id = self._sec_type_map["FOREX"]
 
         symbol_fx = self.iqfeed_service.lookup_symbol(
             search_str="USDJPY",
             security_type_id=security_type_id,
+            connection_name="lookup_test",
         )
 
-        self.assertTrue(subset_dict in symbol_fx.to_dict("records"))
+        self.assertTrue(_row_exists(symbol_fx, subset_dict))
 
     def test_08_lookup_symbol_futures(self):
         """
@@ -120,117 +194,122 @@ class TestService(unittest.TestCase):
         from the lookup port 9100.
         """
         search_str = "E-MINI S&P 500"
-        sec_types = self.iqfeed_service.lookup_security_types()
         # Get the security type code and search for FUTURES symbols.
-        security_type_id = sec_types.loc[
-            sec_types.short_name == "FUTURE", "sec_type_id"
-        ].to_string(header=False, index=False)
+        security_type_id = self._sec_type_map["FUTURE"]
 
         # Search descriptions for E-Mini S&P 500 futures contracts.
         symbol_ft = self.iqfeed_service.lookup_symbol(
             search_str=search_str,
             security_type_id=security_type_id,
             field_to_search="d",
+            connection_name="lookup_test",
         )
 
-        self.assertTrue(search_str in symbol_ft.description[0])
+        self.assertTrue(search_str in symbol_ft.description.iat[0])
 
     def test_09_check_symbols(self):
         """
-        Iterate through all of the symbols stored in the global config.py
-        module, assert that each one is searchable through the IQFeed API.
+        Iterate through all of the futures symbols stored in the global
+        config.py module, assert that each one is searchable through the
+        IQFeed API.
         """
-        sec_types = self.iqfeed_service.lookup_security_types()
-        searchable_array = []
-        for sec_type, symbol_list in config.SECURITIES.items():
-            security_type_id = sec_types.loc[
-                sec_types.short_name == sec_type, "sec_type_id"
-            ].to_string(header=False, index=False)
-
-            if sec_type == "FUTURE":
-                # FUTURE triplet = (symbol, listed_market_id, description)
-                for symbol, listed_market_id, description in symbol_list:
-                    print(f"Symbol search {symbol}")
-                    # Search by symbol and filter to target root symbol. Target
-                    # symbol length is the root + 3 for the month and year code.
-                    # For example, @ES is the root and + 3 for the target MYY.
-                    search_result = self.iqfeed_service.lookup_symbol(
-                        search_str=symbol[:-2],
-                        security_type_id=security_type_id,
-                        field_to_search="s",
-                        symbol_root=symbol[:-2],
-                    )
-                    # Filter results down to the listed_market_id.
-                    search_result = search_result[
-                        search_result.listed_market_id == listed_market_id
-                    ]
-                    # Drop all results with '#', which represents front months
-                    # back adjusted continuous contracts.
-                    search_result = search_result[
-                        ~search_result.symbol.str.contains("#")
-                    ]
-                    # Subset to contract symbols that match the expected length.
-                    search_result = search_result[
-                        search_result.symbol.str.len() == (len(symbol[:-2]) + 3)
-                    ]
-                    # Drop all results with an empty 'description'.
-                    search_result = search_result[
-                        search_result.description.str.len() > 0
-                    ]
-
-                    # Pull the 2 digit year to the front of the string for
-                    # proper sorting resulting in @ESH24, @ESM24, ... instead of
-                    # the default sorting yielding @ESH24, @ESH25, ...
-                    search_result["sort_column"] = (
-                        search_result.symbol.str[-2:]
-                        + search_result.symbol.str[:-2]
-                    )
-                    search_result.sort_values(
-                        by="sort_column",
-                        ascending=True,
-                        inplace=True,
-                        ignore_index=True,
-                    )
-                    if len(search_result) > 0:
-                        searchable_array.append(True)
-                    else:
-                        searchable_array.append(False)
-            else:
+        # Only the futures contracts are checked. FUTURE triplet = (symbol,
+        # listed_market_id, description)
+        symbol_list = config.SECURITIES["FUTURES"]
+        # Search every root symbol concurrently over several lookup
+        # connections, then check the contracts of each root.
+        search_results = asyncio.run(
+            self.iqfeed_service.lookup_symbols_many(
+                search_strs=[symbol[:-2] for symbol, _, _ in symbol_list],
+                security_type_id=self._sec_type_map["FUTURE"],
+                field_to_search="s",
+                filter_root=True,
+            )
+        )
+        # Stop checking at the first symbol that is not found, which is named
+        # in the failure message.
+        missing = next(
+            (
+                symbol
+                for symbol, listed_market_id, _ in symbol_list
+                if not _check_one(search_results, symbol, listed_market_id)
+            ),
+            None,
+        )
+        self.assertIsNone(missing, f"Symbol search failed for {missing}.")
+
+
+class TestStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Share the IQFeed service and a single L1 connection with the streaming
+        and historical data tests.
+        """
+        cls.iqfeed_service = iqfeed_service
+        cls.iqfeed_service.connection(port=5009, name="L1_test")
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.iqfeed_service.connections["L1_test"].disconnect()
+        super().tearDownClass()
+
+    def _wait_for_rows(
+        self,
+        connection: Connection,
+        min_rows: int = 1,
+        timeout: int = 60,
+    ) -> pd.DataFrame:
+        """
+        Read from a stream connection until a DataFrame of at least min_rows is
+        received, instead of sleeping for a fixed time before reading. System
+        messages and reads that time out while the stream is quiet are skipped.
+        The test fails if nothing is received within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                data = connection.read()
+            except TimeoutError:
                 continue
+            if isinstance(data, pd.DataFrame) and len(data) >= min_rows:
+                return data
 
-        self.assertTrue(all(searchable_array))
+        self.fail(f"No update messages received within {timeout}s.")
 
     def test_10_stream_symbol(self):
         """
-        Connect to the L1 port, initialize a stream, and assert that the data
-        received is as expected.
+        Initialize a stream on the shared L1 connection, and assert that the
+        data received is as expected.
         """
         symbol = "@ES#C"
-        self.iqfeed_service.connection(port=5009, name="L1_test")
-        self.iqfeed_service.connections["L1_test"].symbol_watch(symbol)
-        time.sleep(60)  # Pause and allow some data to come through.
-        stream_data = self.iqfeed_service.connections["L1_test"].read()
-        colnames = self.iqfeed_service.connections["L1_test"]._update_fieldnames
-        self.iqfeed_service.connections["L1_test"].symbol_terminate()
-        self.iqfeed_service.connections["L1_test"].disconnect()
-        self.assertTrue(list(stream_data.columns) == colnames)
+        l1_connection = self.iqfeed_service.connections["L1_test"]
+        l1_connection.symbol_watch(symbol)
+        # Read until update messages come through.
+        stream_data = self._wait_for_rows(l1_connection)
+        colnames = l1_connection._update_fieldnames
+        # Stop the stream but keep the connection for the next test.
+        l1_connection.symbol_terminate()
+        # The columns are compared regardless of their order.
+        self.assertEqual(set(stream_data.columns), set(colnames))
 
     def test_11_stream_interval(self):
         """
-        Connect to the L1 port, initialize a stream for interval bars, and
+        Initialize a stream for interval bars on the shared L1 connection, and
         assert that the data receive is as expected.
         """
         symbol = "@ES#C"
-        self.iqfeed_service.connection(port=5009, name="test_interval")
-        self.iqfeed_service.connections["test_interval"].symbol_watch_interval(
+        l1_connection = self.iqfeed_service.connections["L1_test"]
+        l1_connection.symbol_watch_interval(
             symbol=symbol,
             interval=10,
         )
-        time.sleep(30)  # Pause and allow some data to come through.
-        stream_data = self.iqfeed_service.connections["test_interval"].read()
+        # Read until interval messages come through.
+        stream_data = self._wait_for_rows(l1_connection, timeout=30)
         self.assertEqual(
-            list(stream_data.columns),
-            self.iqfeed_service.connections["test_interval"]._update_fieldnames,
+            set(stream_data.columns),
+            set(l1_connection._update_fieldnames),
             "Data received is not as expected.",
         )
 
@@ -241,16 +320,22 @@ class TestService(unittest.TestCase):
         """
         symbol = "@ES#C"
         time_start = datetime.today() - timedelta(days=10)
-        time_start = str(time_start).replace("-", "")[:8] + " 000000"
+        time_start = time_start.strftime("%Y%m%d 000000")
         data_historical = self.iqfeed_service.query_historical(
             symbol=symbol,
             query_type="interval",
             time_start=time_start,
-            pts_per_send=10,
         )
 
         self.assertTrue(len(data_historical) > 0)
 
+
+class TestShutdown(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.iqfeed_service = iqfeed_service
+        super().setUpClass()
+
     def test_13_shutdown(self):
         """
         Shutdown the IQFeed service and assert that admin port is disconnected.
@@ -259,5 +344,18 @@ class TestService(unittest.TestCase):
         self.assertFalse(self.iqfeed_service.connections["9300"]._connected)
 
 
+def load_tests(loader, tests, pattern):
+    """
+    Run the test cases in the order they depend on each other instead of the
+    default alphabetical order. Every test case shares the service launched in
+    setUpModule, which is shut down by the last test case.
+    """
+    suite = unittest.TestSuite()
+    for test_case in [TestLifecycle, TestLookup, TestStream, TestShutdown]:
+        suite.addTests(loader.loadTestsFromTestCase(test_case))
+
+    return suite
+
+
 if __name__ == "__main__":
     unittest.main()
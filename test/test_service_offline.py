@@ -0,0 +1,162 @@
+from iqfeed import Service
+from iqfeed.service import (
+    CREDIT_INTERVAL,
+    HISTORICAL_COLUMNS,
+    HISTORICAL_DTYPES,
+    REQUEST_LIMIT,
+    SYMBOLS_COLUMNS,
+    SYMBOLS_DTYPES,
+)
+import asyncio
+import pandas as pd
+import time
+import unittest
+
+"""
+Test the Service methods that don't need IQConnect to be running, such as
+parsing lookup responses.
+"""
+
+
+class TestParseMessages(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.iqfeed_service = Service()
+        super().setUpClass()
+
+    def _parse_trades(self, data: bytes) -> pd.DataFrame:
+        return self.iqfeed_service._parse_messages(
+            data,
+            HISTORICAL_COLUMNS["trades"],
+            dtype=HISTORICAL_DTYPES["trades"],
+        )
+
+    def test_trades(self):
+        data = (
+            b"LH,2024-01-02 10:00:00.000001,4500.25,3,1003,4500.00,4500.50,"
+            b"7,O,43,01,0,2\r\n"
+        )
+        trades = self._parse_trades(data)
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades.last_size.iat[0], 3)
+        self.assertEqual(trades.trade_market_center.iat[0], 43)
+
+    def test_trades_blank_integer(self):
+        """
+        A blank field in an integer column is a missing value.
+        """
+        data = (
+            b"LH,2024-01-02 10:00:00.000001,4500.25,,1003,4500.00,4500.50,"
+            b"7,O,,01,0,2\r\n"
+        )
+        trades = self._parse_trades(data)
+        self.assertTrue(pd.isna(trades.last_size.iat[0]))
+        self.assertTrue(pd.isna(trades.trade_market_center.iat[0]))
+        self.assertEqual(str(trades.last_size.dtype), "Int32")
+
+    def test_lookup_request_id(self):
+        """
+        The request_id is parsed as the first column and the message_id is
+        skipped.
+        """
+        symbols = self.iqfeed_service._parse_messages(
+            b"7,LS,@ESH25,43,8,E-MINI S&P 500 MARCH 2025,\r\n"
+            b"7,LS,@ESM25,43,8,E-MINI S&P 500 JUNE 2025,\r\n",
+            ("request_id", *SYMBOLS_COLUMNS),
+            request_id="7",
+            dtype=SYMBOLS_DTYPES,
+        )
+        self.assertEqual(list(symbols.request_id), ["7", "7"])
+        self.assertEqual(list(symbols.symbol), ["@ESH25", "@ESM25"])
+        self.assertEqual(symbols.listed_market_id.dtype, "category")
+
+    def test_errors(self):
+        """
+        Error messages are dropped wherever they are in the response.
+        """
+        for data in [
+            b"E,!NO_DATA!,\r\n",
+            b"LH,2024-01-02 10:00:00.000001,4500.25,3,1003,4500.00,4500.50,"
+            b"7,O,43,01,0,2\r\nE,!SYNTAX_ERROR!,\r\n",
+        ]:
+            with self.assertLogs("iqfeed.service", level="ERROR") as logs:
+                trades = self._parse_trades(data)
+            self.assertIn("IQFeed Error: !", logs.output[0])
+            self.assertEqual(len(trades), data.count(b"LH,"))
+
+    def test_unexpected_messages(self):
+        """
+        Fields are parsed by position, so a message without the request_id and
+        message_id in front of the fields is logged and dropped instead of
+        shifting the columns.
+        """
+        with self.assertLogs("iqfeed.service", level="ERROR") as logs:
+            symbols = self.iqfeed_service._parse_messages(
+                b"7,LS,@ESH25,43,8,E-MINI S&P 500 MARCH 2025,\r\n"
+                b"7,@ESM25,43,8,E-MINI S&P 500 JUNE 2025,\r\n"
+                b",LS,@ESU25,43,8,E-MINI S&P 500 SEP 2025,\r\n",
+                ("request_id", *SYMBOLS_COLUMNS),
+                request_id="7",
+                dtype=SYMBOLS_DTYPES,
+            )
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(list(symbols.symbol), ["@ESH25"])
+        self.assertEqual(
+            list(symbols.description), ["E-MINI S&P 500 MARCH 2025"]
+        )
+
+    def test_empty_dtypes(self):
+        """
+        An empty response has the same column types as a response with data.
+        """
+        data = (
+            b"LH,2024-01-02 10:00:00.000001,4500.25,3,1003,4500.00,4500.50,"
+            b"7,O,43,01,0,2\r\n"
+        )
+        self.assertEqual(
+            self._parse_trades(b"").dtypes.to_dict(),
+            self._parse_trades(data).dtypes.to_dict(),
+        )
+
+
+class TestLookupSymbolsMany(unittest.TestCase):
+    def test_no_searches(self):
+        """
+        An empty list of searches returns an empty data frame of symbols.
+        """
+        iqfeed_service = Service()
+        symbols = asyncio.run(iqfeed_service.lookup_symbols_many([]))
+        self.assertEqual(len(symbols), 0)
+        self.assertEqual(list(symbols.columns), list(SYMBOLS_COLUMNS))
+
+
+class TestReserveRequest(unittest.TestCase):
+    def test_burst(self):
+        """
+        Up to REQUEST_LIMIT requests are made without waiting. Each request
+        after that waits for its own credit.
+        """
+        iqfeed_service = Service()
+        waits = [
+            iqfeed_service._reserve_request() for _ in range(REQUEST_LIMIT)
+        ]
+        self.assertLess(max(waits), CREDIT_INTERVAL)
+        first = iqfeed_service._reserve_request()
+        second = iqfeed_service._reserve_request()
+        self.assertGreater(first, 0)
+        self.assertAlmostEqual(second - first, CREDIT_INTERVAL, delta=0.005)
+
+    def test_refill(self):
+        """
+        Credits are replenished for the time elapsed up to REQUEST_LIMIT.
+        """
+        iqfeed_service = Service()
+        for _ in range(REQUEST_LIMIT + 10):
+            iqfeed_service._reserve_request()
+        iqfeed_service._last_refill = time.monotonic() - 60
+        self.assertEqual(iqfeed_service._reserve_request(), 0)
+        self.assertLessEqual(iqfeed_service._credits, REQUEST_LIMIT - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()